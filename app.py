@@ -1,22 +1,26 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Form, Request
-from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-import cv2
-import numpy as np
 from pdf2image import convert_from_path
 import uvicorn
 import os
-import uuid
 from datetime import datetime
-import aiofiles
 import traceback
 import json
+import asyncio
+from typing import List, Optional
 
 # Importar módulos
-from database import db
+from database import db, parse_filter_date
 from invoice_processor import processor
 from email_system import email_system
+from ocr_executor import OCRQueueFullError, OCRTimeoutError
+from ingestion import ingest_file, ingest_batch
+from jobs import job_queue, JobQueueFullError
+from hot_folder import hot_folder, ingest_hot_file
+from file_intake import (save_upload_stream, extract_zip, UploadTooLargeError, UnsupportedFileTypeError,
+                         UploadSizeLimitMiddleware)
 import config
 
 app = FastAPI(
@@ -42,13 +46,77 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 # Crear directorio de uploads
 os.makedirs(config.Config.UPLOAD_FOLDER, exist_ok=True)
 
+# Margen para los campos del formulario multipart además del archivo
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+def upload_body_limit(path):
+    """Máximo en bytes del cuerpo de una subida (None si la ruta no es de subida)"""
+    if not path.startswith("/api/upload"):
+        return None
+    if path == "/api/upload-invoices/batch":
+        max_mb = config.Config.BATCH_MAX_MB
+    else:
+        max_mb = config.Config.UPLOAD_MAX_MB
+    return max_mb * 1024 * 1024 + UPLOAD_FORM_OVERHEAD
+
+# Rechazo temprano por Content-Length y corte del flujo si el cuerpo real lo supera
+app.add_middleware(UploadSizeLimitMiddleware, limit_for=upload_body_limit)
+
+async def _process_upload_job(job, report):
+    """Procesa un trabajo de la cola: OCR, guardado en BD y notificación"""
+    payload = job['payload']
+    file_path = payload['file_path']
+    approver_email = payload['approver_email']
+    
+    cancelled = False
+    try:
+        report("Extrayendo datos con OCR")
+        invoice_id, invoice_data = await ingest_file(file_path, payload.get('content_hash'))
+        
+        report("Encolando notificación")
+        email_system.notify_approver(approver_email, invoice_data, str(invoice_id))
+    except asyncio.CancelledError:
+        # Apagado del servidor: el trabajo se reanuda al reiniciar y necesita el archivo
+        cancelled = True
+        raise
+    finally:
+        # También si el trabajo falla: un trabajo fallido no se reintenta
+        if not cancelled and os.path.exists(file_path):
+            os.remove(file_path)
+            print("🧹 Archivo temporal eliminado")
+    
+    return {
+        "invoice_id": str(invoice_id),
+        "confianza_extraccion": invoice_data.get('confianza_ocr', 0),
+        "notification_sent_to": approver_email
+    }
+
+@app.on_event("startup")
+async def startup_event():
+    """Arrancar los workers de la cola de trabajos y la bandeja de salida de emails"""
+    await job_queue.start(_process_upload_job)
+    await email_system.start()
+    if config.Config.HOT_FOLDER_ENABLED:
+        await hot_folder.start(ingest_hot_file)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Detener workers y ejecutor OCR al apagar el servidor"""
+    await job_queue.stop()
+    await hot_folder.stop()
+    processor.executor.shutdown()
+    await email_system.shutdown()
+
 @app.post("/api/upload-invoice")
 async def upload_invoice(
-    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
-    approver_email: str = Form("diego.31326600@uru.edu")
+    approver_email: str = Form("diego.31326600@uru.edu"),
+    async_mode: bool = Form(False)
 ):
-    """Endpoint para subir y procesar facturas - MEJORADO"""
+    """Endpoint para subir y procesar facturas - MEJORADO
+    
+    Con async_mode=true responde 202 con un job_id y el OCR se hace en la cola.
+    """
     try:
         print(f"📥 Iniciando procesamiento MEJORADO de factura...")
         print(f"📧 Email destinatario: {approver_email}")
@@ -57,66 +125,56 @@ async def upload_invoice(
         if not file.filename or not file.content_type:
             raise HTTPException(status_code=400, detail="Archivo inválido")
         
-        file_extension = file.filename.split('.')[-1].lower()
-        
-        # Validar tipos de archivo mejorados
-        allowed_extensions = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp'}
-        if file_extension not in allowed_extensions:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Formato no soportado. Use: {', '.join(allowed_extensions)}"
-            )
-        
-        print(f"✅ Archivo válido: {file.filename} ({file_extension})")
-        
-        # Resto del código permanece igual...
-        
-        # Validar extensión
-        file_extension = file.filename.split('.')[-1].lower()
-        if file_extension not in config.Config.ALLOWED_EXTENSIONS:
-            raise HTTPException(status_code=400, detail=f"Formato de archivo no soportado. Formatos permitidos: {', '.join(config.Config.ALLOWED_EXTENSIONS)}")
-        
-        print(f"✅ Extensión válida: {file_extension}")
-        
-        # Guardar archivo temporal
-        file_path = f"{config.Config.UPLOAD_FOLDER}/{uuid.uuid4()}.{file_extension}"
-        
-        print(f"📁 Guardando archivo temporal: {file_path}")
-        
-        # Guardar archivo con aiofiles
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await file.read()
-            await f.write(content)
-        
-        print(f"✅ Archivo guardado ({len(content)} bytes), procesando con OCR...")
-        
-        # Procesar factura
-        invoice_data = await processor.process_invoice(file_path)
-        
-        print(f"📊 Datos extraídos: {invoice_data}")
-        
-        # Guardar en base de datos
-        invoice_id = db.save_invoice(invoice_data)
-        
-        if not invoice_id:
-            raise HTTPException(status_code=500, detail="Error guardando factura en base de datos")
+        # Guardar archivo temporal por bloques (tipo real por magic bytes y tamaño validados
+        # sobre la marcha; la extensión del nombre no se usa)
+        saved = await save_upload_stream(
+            file,
+            config.Config.UPLOAD_FOLDER,
+            max_bytes=config.Config.UPLOAD_MAX_MB * 1024 * 1024,
+            allowed_types=config.Config.ALLOWED_EXTENSIONS,
+            chunk_size=config.Config.UPLOAD_CHUNK_KB * 1024
+        )
+        file_path = saved['file_path']
+        content_hash = saved['content_hash']
         
-        print(f"💾 Guardado en BD con ID: {invoice_id}")
+        print(f"📁 Archivo temporal guardado: {file_path}")
         
-        # Enviar notificación por email (en background)
-        background_tasks.add_task(
-            email_system.send_notification,
-            approver_email,
-            invoice_data,
-            str(invoice_id)
-        )
+        if async_mode:
+            print(f"✅ Archivo guardado ({saved['size']} bytes), encolando trabajo...")
+            try:
+                job = job_queue.submit({
+                    "file_path": file_path,
+                    "filename": file.filename,
+                    "approver_email": approver_email,
+                    "content_hash": content_hash
+                })
+            except JobQueueFullError:
+                os.remove(file_path)
+                raise
+            
+            return JSONResponse(status_code=202, content={
+                "message": "Factura recibida, procesamiento en cola",
+                "job_id": job['job_id'],
+                "status": job['status'],
+                "status_url": f"/api/jobs/{job['job_id']}",
+                "timestamp": datetime.utcnow().isoformat()
+            })
         
-        print(f"📧 Notificación en cola para: {approver_email}")
+        print(f"✅ Archivo guardado ({saved['size']} bytes), procesando con OCR...")
         
-        # Limpiar archivo temporal
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            print("🧹 Archivo temporal eliminado")
+        try:
+            # Procesar factura y guardar en base de datos (el hash evita releer el archivo para la caché)
+            invoice_id, invoice_data = await ingest_file(file_path, content_hash)
+            
+            # Enviar notificación por email (bandeja de salida o resumen del aprobador)
+            email_system.notify_approver(approver_email, invoice_data, str(invoice_id))
+            
+            print(f"📧 Notificación en cola para: {approver_email}")
+        finally:
+            # Limpiar archivo temporal (también si el OCR falla)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+                print("🧹 Archivo temporal eliminado")
         
         response_data = {
             "message": "Factura procesada exitosamente",
@@ -131,12 +189,145 @@ async def upload_invoice(
         print(f"🎉 Procesamiento completado exitosamente!")
         return JSONResponse(response_data)
         
+    except HTTPException:
+        raise
+    except UploadTooLargeError as e:
+        print(f"📦 {e}")
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedFileTypeError as e:
+        print(f"🚫 {e}")
+        raise HTTPException(status_code=415, detail=f"Formato de archivo no soportado: {str(e)}")
+    except OCRQueueFullError as e:
+        print(f"⏳ {e}")
+        raise HTTPException(status_code=503, detail=f"Servidor OCR ocupado, reintente más tarde: {str(e)}",
+                            headers={"Retry-After": "10"})
+    except OCRTimeoutError as e:
+        print(f"⏱️  {e}")
+        raise HTTPException(status_code=504, detail=f"Tiempo de OCR agotado: {str(e)}")
+    except JobQueueFullError as e:
+        print(f"⏳ {e}")
+        raise HTTPException(status_code=503, detail=f"Cola de trabajos llena, reintente más tarde: {str(e)}",
+                            headers={"Retry-After": "30"})
     except Exception as e:
         # Mostrar el error completo
         print(f"❌ ERROR DETALLADO:")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Error procesando factura: {str(e)}")
 
+# Lotes en curso: se completan (y notifican) aunque el cliente cierre la conexión
+_batch_tasks = set()
+
+async def _run_batch(files, approver_email, results):
+    """Procesa el lote y envía una única notificación con todas las facturas procesadas"""
+    processed = await ingest_batch(files, config.Config.BATCH_CONCURRENCY, results)
+    invoices = [(result['invoice_data'], result['invoice_id']) for result in processed if result['status'] == "procesada"]
+    email_system.notify_batch(approver_email, invoices)
+    print(f"📦 Lote completado: {len(invoices)}/{len(files)} facturas, notificación para {approver_email}")
+    return processed
+
+@app.post("/api/upload-invoices/batch")
+async def upload_invoices_batch(
+    files: List[UploadFile] = File(...),
+    approver_email: str = Form("diego.31326600@uru.edu")
+):
+    """Subir muchas facturas (varios archivos y/o ZIPs) en una sola petición.
+    
+    Todos los archivos se guardan en disco antes de empezar; después se procesan
+    con concurrencia acotada y la respuesta es NDJSON: una línea por archivo en
+    cuanto termina y una última línea con el resumen del lote.
+    """
+    print(f"📥 Lote recibido: {len(files)} archivos para {approver_email}")
+    max_bytes = config.Config.UPLOAD_MAX_MB * 1024 * 1024
+    chunk_size = config.Config.UPLOAD_CHUNK_KB * 1024
+    allowed_types = config.Config.ALLOWED_EXTENSIONS | {'zip'}
+    max_files = config.Config.BATCH_MAX_FILES
+    max_total_bytes = config.Config.BATCH_MAX_MB * 1024 * 1024
+    
+    if len(files) > max_files:
+        raise HTTPException(status_code=413, detail=f"El lote supera el máximo de {max_files} archivos")
+    
+    saved, rejected = [], []
+    try:
+        for file in files:
+            try:
+                item = await save_upload_stream(file, config.Config.UPLOAD_FOLDER, max_bytes, allowed_types, chunk_size)
+            except (UploadTooLargeError, UnsupportedFileTypeError) as e:
+                rejected.append({"archivo": file.filename, "status": "rechazada", "error": str(e)})
+                continue
+            
+            if item['file_type'] != 'zip':
+                saved.append({**item, "archivo": file.filename})
+            else:
+                # ZIP: extraer sus facturas con las mismas validaciones y descartar el archivo.
+                # Los límites de archivos y bytes son los que le quedan al lote.
+                try:
+                    members = await asyncio.to_thread(
+                        extract_zip, item['file_path'], config.Config.UPLOAD_FOLDER, max_bytes,
+                        config.Config.ALLOWED_EXTENSIONS, max_files - len(saved),
+                        max_total_bytes - sum(entry['size'] for entry in saved), chunk_size
+                    )
+                except UploadTooLargeError:
+                    raise
+                except Exception as e:
+                    rejected.append({"archivo": file.filename, "status": "rechazada", "error": f"ZIP inválido: {e}"})
+                    continue
+                finally:
+                    os.remove(item['file_path'])
+                for member in members:
+                    name = f"{file.filename}/{member['archivo']}"
+                    if 'error' in member:
+                        rejected.append({"archivo": name, "status": "rechazada", "error": member['error']})
+                    else:
+                        saved.append({**member, "archivo": name})
+            
+            if len(saved) > max_files:
+                raise UploadTooLargeError(f"El lote supera el máximo de {max_files} archivos")
+    except UploadTooLargeError as e:
+        for item in saved:
+            if os.path.exists(item['file_path']):
+                os.remove(item['file_path'])
+        raise HTTPException(status_code=413, detail=str(e))
+    
+    # Mismo contenido repetido en el lote: se procesa una sola vez
+    unique, seen = [], set()
+    for item in saved:
+        if item['content_hash'] in seen:
+            os.remove(item['file_path'])
+            rejected.append({"archivo": item['archivo'], "status": "duplicada", "hash_contenido": item['content_hash']})
+        else:
+            seen.add(item['content_hash'])
+            unique.append(item)
+    
+    print(f"✅ Lote guardado: {len(unique)} archivos a procesar, {len(rejected)} descartados")
+    results = asyncio.Queue()
+    task = asyncio.create_task(_run_batch(unique, approver_email, results))
+    _batch_tasks.add(task)
+    task.add_done_callback(_batch_tasks.discard)
+    
+    async def stream_results():
+        for result in rejected:
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        for _ in unique:
+            result = dict(await results.get())
+            if result['status'] == "procesada":
+                invoice_data = result.pop('invoice_data')
+                result['confianza_extraccion'] = invoice_data.get('confianza_ocr', 0)
+                result['numero_factura'] = invoice_data.get('numero_factura')
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        processed = await task
+        yield json.dumps({
+            "resumen": {
+                "total": len(unique) + len(rejected),
+                "procesadas": sum(1 for result in processed if result['status'] == "procesada"),
+                "errores": sum(1 for result in processed if result['status'] == "error"),
+                "descartadas": len(rejected),
+                "notification_sent_to": approver_email,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        }, ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 @app.get("/api/approve/{invoice_id}")
 async def approve_invoice(invoice_id: str):
     """Endpoint para aprobar factura - llamado desde el email"""
@@ -849,7 +1040,7 @@ async def approved_invoices():
 @app.get("/all-invoices", response_class=HTMLResponse)
 async def all_invoices():
     """Página para ver todas las facturas"""
-    invoices = db.invoices
+    invoices = db.get_all_invoices()
     
     # Contar facturas por estado
     status_counts = {
@@ -1064,63 +1255,166 @@ async def get_invoice(invoice_id: str):
         print(f"❌ Error obteniendo factura: {e}")
         raise HTTPException(status_code=500, detail=f"Error obteniendo factura: {str(e)}")
 
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Consultar el estado de un trabajo de ingesta asíncrona"""
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    
+    response = {key: value for key, value in job.items() if key != 'payload'}
+    response['filename'] = job['payload'].get('filename')
+    return response
+
+@app.get("/api/ocr-cache/stats")
+async def ocr_cache_stats():
+    """Aciertos, fallos y tamaño de la caché OCR"""
+    if not processor.cache:
+        return {"habilitada": False}
+    return {"habilitada": True, **processor.cache.stats()}
+
+@app.delete("/api/ocr-cache")
+async def invalidate_ocr_cache():
+    """Vaciar toda la caché OCR"""
+    if not processor.cache:
+        raise HTTPException(status_code=404, detail="Caché OCR deshabilitada")
+    removed = processor.cache.invalidate()
+    return {"message": "Caché OCR vaciada", "entradas_eliminadas": removed}
+
+@app.delete("/api/ocr-cache/{content_hash}")
+async def invalidate_ocr_cache_entry(content_hash: str):
+    """Invalidar los resultados cacheados de un archivo (por su hash_contenido)"""
+    if not processor.cache:
+        raise HTTPException(status_code=404, detail="Caché OCR deshabilitada")
+    removed = processor.cache.invalidate(content_hash)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Hash no encontrado en caché")
+    return {"message": "Entrada invalidada", "entradas_eliminadas": removed}
+
+@app.get("/api/email/outbox")
+async def email_outbox_stats():
+    """Métricas de la bandeja de salida: profundidad, fallidos y latencias de envío"""
+    return {
+        **email_system.outbox.stats(),
+        "smtp": email_system.dispatcher.stats()
+    }
+
+@app.get("/api/email/dead-letters")
+async def email_dead_letters():
+    """Emails que agotaron sus reintentos"""
+    dead = email_system.outbox.dead_letters()
+    return {"total": len(dead), "emails": dead}
+
+@app.post("/api/email/dead-letters/replay")
+async def replay_all_dead_letters():
+    """Reencolar todos los emails fallidos"""
+    replayed = email_system.outbox.replay()
+    return {"message": "Emails reencolados", "reencolados": replayed}
+
+@app.post("/api/email/dead-letters/{entry_id}/replay")
+async def replay_dead_letter(entry_id: str):
+    """Reencolar un email fallido"""
+    if not email_system.outbox.replay(entry_id):
+        raise HTTPException(status_code=404, detail="Email fallido no encontrado")
+    return {"message": "Email reencolado", "id": entry_id}
+
+@app.get("/api/email/digest")
+async def email_digest_stats():
+    """Facturas acumuladas en resúmenes pendientes de envío"""
+    return {
+        "activo": config.Config.EMAIL_DIGEST_ENABLED,
+        **email_system.digest.stats()
+    }
+
+@app.post("/api/email/digest/flush")
+async def flush_email_digest(approver_email: Optional[str] = None):
+    """Enviar ya los resúmenes pendientes (de un aprobador o de todos)"""
+    flushed = email_system.digest.flush(approver_email)
+    return {"message": "Resúmenes encolados para envío", "facturas": flushed}
+
+@app.get("/api/supplier-templates")
+async def supplier_templates():
+    """Plantillas de proveedor cargadas y cuántas facturas reconocieron"""
+    return processor.supplier_templates.stats()
+
+@app.get("/api/hot-folder")
+async def hot_folder_stats():
+    """Estado de la ingesta automática desde la carpeta vigilada"""
+    return hot_folder.stats()
+
 @app.get("/api/invoices")
-async def get_all_invoices():
-    """Obtener todas las facturas"""
+async def get_all_invoices(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    proveedor: Optional[str] = None,
+    fecha_desde: Optional[str] = None,
+    fecha_hasta: Optional[str] = None,
+    monto_min: Optional[float] = None,
+    monto_max: Optional[float] = None,
+    fields: Optional[str] = None
+):
+    """Listar facturas paginadas por cursor, con filtros y proyección de campos
+    
+    Fechas en formato AAAA-MM-DD; fields separados por coma (ej. fields=proveedor,monto_total).
+    """
     try:
-        print("📋 Listando todas las facturas...")
-        invoices = db.invoices
+        print("📋 Listando facturas...")
+        limit = max(1, min(limit, 500))
+        field_list = [field.strip() for field in fields.split(',') if field.strip()] if fields else None
+        
+        try:
+            # Las fechas se comparan como texto ISO: una mal formada daría resultados erróneos
+            filters = {
+                "status": status,
+                "proveedor": proveedor,
+                "fecha_desde": parse_filter_date(fecha_desde),
+                "fecha_hasta": parse_filter_date(fecha_hasta),
+                "monto_min": monto_min,
+                "monto_max": monto_max
+            }
+            invoices, next_cursor = db.list_invoices(limit=limit, cursor=cursor, filters=filters, fields=field_list)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         return {
-            "total": len(invoices),
+            "total": db.count_invoices(),
+            "count": len(invoices),
+            "next_cursor": next_cursor,
             "invoices": invoices
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error listando facturas: {e}")
         raise HTTPException(status_code=500, detail=f"Error listando facturas: {str(e)}")
 
 @app.get("/api/stats")
 async def get_stats():
-    """Obtener estadísticas del sistema"""
+    """Obtener estadísticas del sistema (agregados mantenidos por la base de datos)"""
     try:
-        invoices = db.invoices
-        total_invoices = len(invoices)
-        status_count = {
-            "En Proceso": 0,
-            "Aprobado": 0,
-            "Rechazado": 0
-        }
-        
-        total_amount = 0
-        rejected_with_comments = 0
-        
-        for invoice_id, invoice in invoices.items():
-            status = invoice.get('status', 'En Proceso')
-            status_count[status] = status_count.get(status, 0) + 1
-            
-            # Sumar montos de facturas aprobadas
-            if status == "Aprobado" and invoice.get('monto_total'):
-                try:
-                    total_amount += float(invoice['monto_total'])
-                except (ValueError, TypeError):
-                    pass
-            
-            # Contar rechazos con comentarios
-            if status == "Rechazado" and invoice.get('rejection_comments'):
-                rejected_with_comments += 1
-        
         return {
-            "total_facturas": total_invoices,
-            "por_estado": status_count,
-            "monto_total_aprobado": round(total_amount, 2),
-            "rechazos_con_comentarios": rejected_with_comments,
-            "facturas_procesadas_hoy": len([inv for inv in invoices.values() 
-                                          if inv.get('created_at', '').startswith(datetime.utcnow().strftime('%Y-%m-%d'))]),
+            **db.get_stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
     except Exception as e:
         print(f"❌ Error obteniendo estadísticas: {e}")
         raise HTTPException(status_code=500, detail=f"Error obteniendo estadísticas: {str(e)}")
 
+@app.post("/api/stats/rebuild")
+async def rebuild_stats():
+    """Recalcular las estadísticas desde cero si se desincronizan"""
+    try:
+        print("🔄 Recalculando estadísticas...")
+        return {
+            "message": "Estadísticas recalculadas",
+            "stats": db.rebuild_stats(),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    except Exception as e:
+        print(f"❌ Error recalculando estadísticas: {e}")
+        raise HTTPException(status_code=500, detail=f"Error recalculando estadísticas: {str(e)}")
+
 # Interfaz web principal (ACTUALIZADA con nuevos enlaces)
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
@@ -1484,6 +1778,13 @@ async def health_check():
         "service": "Invoice Processing System v2.1",
         "timestamp": datetime.utcnow().isoformat(),
         "version": "2.1.0",
+        "ocr_executor": processor.executor.stats(),
+        "ocr_workers": processor.ocr_worker_stats(),
+        "job_queue": job_queue.stats(),
+        "smtp": email_system.dispatcher.stats(),
+        "email_outbox": email_system.outbox.stats(),
+        "email_digest": email_system.digest.stats(),
+        "hot_folder": hot_folder.stats(),
         "features": [
             "OCR inteligente con Tesseract",
             "Procesamiento de PDF e imágenes", 
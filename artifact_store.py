@@ -0,0 +1,153 @@
+# artifact_store.py
+import os
+import queue
+import threading
+import time
+import config
+
+
+class NullArtifactStore:
+    """Sin modo depuración: las imágenes de página no se guardan"""
+
+    enabled = False
+
+    def save_image(self, name, image):
+        pass
+
+    def flush(self, timeout=None):
+        pass
+
+    def close(self, timeout=None):
+        pass
+
+    def stats(self):
+        return {"activo": False}
+
+
+class LocalArtifactStore:
+    """Imágenes de depuración/auditoría en una carpeta local.
+
+    save_image sólo encola: la codificación PNG y la escritura las hace un
+    hilo de fondo, fuera del camino del OCR. Si la cola está llena la imagen
+    se descarta (es un artefacto de depuración, no un dato). Tras escribir se
+    borran los archivos más antiguos que max_age_seconds y, si la carpeta
+    supera max_bytes, los más viejos hasta volver al límite. La carpeta se
+    revisa entera como mucho cada prune_interval segundos porque varios
+    procesos OCR pueden escribir en ella. En los procesos de trabajo no se
+    ejecuta atexit: el ejecutor OCR llama a flush() al final de cada trabajo.
+    """
+
+    enabled = True
+
+    def __init__(self, folder, max_bytes, max_age_seconds, max_pending=16, prune_interval=30):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.prune_interval = prune_interval
+        self.saved = 0
+        self.dropped = 0
+        self.pruned = 0
+        self._queue = queue.Queue(maxsize=max(1, max_pending))
+        self._thread = None
+        self._lock = threading.Lock()
+        self._last_prune = 0
+
+    def save_image(self, name, image):
+        """Encolar una imagen PIL para guardarla como <name>.png"""
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((name, image))
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️  Cola de artefactos llena, no se guarda {name}")
+
+    def _ensure_writer(self):
+        # El hilo se crea al primer uso: cada proceso OCR tiene el suyo
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                os.makedirs(self.folder, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="artifact-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._write(*item)
+                if time.monotonic() - self._last_prune >= self.prune_interval:
+                    self.prune()
+            except Exception as e:
+                print(f"❌ Error guardando artefacto: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, name, image):
+        path = os.path.join(self.folder, f"{name}.png")
+        tmp_path = f"{path}.tmp"
+        image.save(tmp_path, "PNG")
+        os.replace(tmp_path, path)
+        self.saved += 1
+        print(f"💾 Imagen guardada: {path}")
+
+    def prune(self, now=None):
+        """Aplicar la retención por antigüedad y por tamaño total"""
+        self._last_prune = time.monotonic()
+        now = now or time.time()
+        files = []
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and entry.name.endswith('.png'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        for mtime, size, path in files:
+            expired = now - mtime > self.max_age_seconds
+            if not expired and total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.pruned += 1
+
+    def flush(self, timeout=5):
+        """Esperar (como mucho timeout segundos) a que se escriban las imágenes encoladas"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self, timeout=5):
+        """Esperar a que se escriban las imágenes pendientes"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {
+            "activo": True,
+            "carpeta": self.folder,
+            "pendientes": self._queue.qsize(),
+            "guardadas": self.saved,
+            "descartadas": self.dropped,
+            "borradas": self.pruned
+        }
+
+
+def create_artifact_store():
+    """Almacén de artefactos según config.Config.DEBUG_ARTIFACTS y ARTIFACTS_BACKEND"""
+    cfg = config.Config
+    if not cfg.DEBUG_ARTIFACTS:
+        return NullArtifactStore()
+    if cfg.ARTIFACTS_BACKEND == "local":
+        return LocalArtifactStore(
+            cfg.ARTIFACTS_FOLDER,
+            cfg.ARTIFACTS_MAX_MB * 1024 * 1024,
+            cfg.ARTIFACTS_MAX_AGE_HOURS * 3600,
+            max_pending=cfg.ARTIFACTS_MAX_PENDING
+        )
+    raise ValueError(f"ARTIFACTS_BACKEND desconocido: {cfg.ARTIFACTS_BACKEND}")
@@ -0,0 +1,279 @@
+# benchmark.py
+import argparse
+import contextlib
+import io
+import os
+import time
+
+
+def _timeit(fn, iterations):
+    """Tiempo medio por llamada en milisegundos"""
+    fn()  # calentamiento
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+def benchmark_email(iterations):
+    """Render de notificaciones: Template por email vs Environment precompilado"""
+    from jinja2 import Template
+    from email_system import email_system, TEMPLATES_FOLDER
+
+    invoice_data = {
+        '_id': '17000000000001', 'proveedor': 'Proveedor Ejemplo C.A.', 'numero_factura': 'F-0001',
+        'fecha_emision': '01/02/2024', 'monto_total': 1250.0, 'impuestos': 200.0,
+        'fecha_vencimiento': '01/03/2024', 'confianza_ocr': 0.87
+    }
+    approval_url = "http://localhost:8000/api/approve/17000000000001"
+    rejection_url = "http://localhost:8000/reject-form/17000000000001"
+
+    # Comportamiento anterior: la plantilla completa se parsea y compila en cada email
+    with open(os.path.join(TEMPLATES_FOLDER, "notificacion.html"), encoding='utf-8') as f:
+        source = f.read()
+    with open(os.path.join(TEMPLATES_FOLDER, "estilos.css"), encoding='utf-8') as f:
+        source = source.replace("{{ estilos }}", f.read())
+    context = email_system._template_context(invoice_data, approval_url, rejection_url)
+
+    legacy = _timeit(lambda: Template(source).render(**context), iterations)
+    compiled = _timeit(lambda: email_system.create_email_template(invoice_data, approval_url, rejection_url), iterations)
+    batch = [(invoice_data, invoice_data['_id'])] * 100
+    bulk = _timeit(lambda: email_system.render_notifications(batch), max(1, iterations // 100)) / len(batch)
+
+    print(f"📧 Render de notificación ({iterations} iteraciones)")
+    print(f"   Template por email:       {legacy:.3f} ms/email")
+    print(f"   Plantilla precompilada:   {compiled:.3f} ms/email ({legacy / compiled:.1f}x)")
+    print(f"   render_notifications(100): {bulk:.3f} ms/email")
+
+
+def benchmark_parser(iterations):
+    """parse_invoice_data sobre los textos del corpus de regresión, como documento de muchas páginas"""
+    from json_store import load_json
+    from invoice_processor import processor
+    from parser_regression import CORPUS_FILE
+
+    corpus = load_json(CORPUS_FILE, {})
+    if not corpus:
+        print("❌ Corpus vacío: ejecute primero python parser_regression.py --build")
+        return
+    pages = [entry['texto'] for entry in corpus.values()] * 10
+    text = "\n".join(f"--- Página {n + 1} ---\n{page}" for n, page in enumerate(pages))
+
+    def parse():
+        with contextlib.redirect_stdout(io.StringIO()):
+            processor.parse_invoice_data(text)
+
+    elapsed = _timeit(parse, iterations)
+    print(f"🔍 Parser de campos ({iterations} iteraciones, {len(pages)} páginas, {len(text)} caracteres)")
+    print(f"   {elapsed:.3f} ms/documento ({len(text) / elapsed / 1000:.1f} MB/s)")
+
+
+def _sample_pages():
+    """Páginas de ejemplo: PDFs rasterizados a la resolución del procesador e imágenes subidas"""
+    import fitz
+    from PIL import Image
+    from invoice_processor import processor
+
+    pages = {}
+    for folder in ("pdfs", "uploads"):
+        for name in sorted(os.listdir(folder)):
+            path = os.path.join(folder, name)
+            if name.lower().endswith('.pdf'):
+                with fitz.open(path) as doc:
+                    zoom = processor.pdf_dpi / 72
+                    pix = doc.load_page(0).get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+                    pages[name] = Image.open(io.BytesIO(pix.tobytes("ppm")))
+            elif name.lower().endswith(('.png', '.jpg', '.jpeg', '.tiff', '.bmp')):
+                pages[name] = Image.open(path)
+                pages[name].load()
+    return pages
+
+
+def benchmark_preprocess(iterations):
+    """Preprocesamiento de página: cadena PIL original vs OpenCV vectorizado.
+
+    Con Tesseract instalado y el corpus de regresión generado compara además
+    la precisión: similitud del texto OCR con el del corpus y campos del
+    parser que coinciden con los esperados.
+    """
+    import difflib
+    import pytesseract
+    import image_preprocessing
+    from json_store import load_json
+    from invoice_processor import processor
+    from parser_regression import CORPUS_FILE
+
+    if not image_preprocessing.OPENCV_AVAILABLE:
+        print("❌ OpenCV no instalado: pip install numpy opencv-python-headless")
+        return
+    pages = _sample_pages()
+    iterations = max(1, iterations // 20)
+    print(f"🧪 Preprocesamiento ({iterations} iteraciones por página)")
+    total_pil = total_cv = 0
+    for name, image in pages.items():
+        with contextlib.redirect_stdout(io.StringIO()):
+            pil = _timeit(lambda: processor._preprocess_image_pil(image), iterations)
+        cv = _timeit(lambda: image_preprocessing.preprocess(image, processor.preprocess_params), iterations)
+        _, steps, _ = image_preprocessing.preprocess(image, processor.preprocess_params)
+        total_pil += pil
+        total_cv += cv
+        print(f"   {name} {image.size[0]}x{image.size[1]}: PIL {pil:.1f} ms, OpenCV {cv:.1f} ms "
+              f"({pil / cv:.1f}x) [{', '.join(steps)}]")
+    print(f"   Total: PIL {total_pil:.1f} ms, OpenCV {total_cv:.1f} ms ({total_pil / total_cv:.1f}x)")
+
+    corpus = {os.path.basename(path): entry for path, entry in load_json(CORPUS_FILE, {}).items()}
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        print("⚠️  Tesseract no disponible: sin comparación de precisión")
+        return
+    if not corpus:
+        print("⚠️  Corpus vacío (python parser_regression.py --build): sin comparación de precisión")
+        return
+
+    def accuracy(processed, entry):
+        """(similitud con el texto del corpus, campos iguales a los esperados)"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            text = processor._ocr(processed)
+            fields = processor.parse_invoice_data(text)
+        reference = " ".join(entry['texto'].split())
+        ratio = difflib.SequenceMatcher(None, " ".join(text.split()), reference).ratio()
+        matched = sum(1 for key, value in entry['esperado'].items() if str(fields.get(key)) == str(value))
+        return ratio, matched, len(entry['esperado'])
+
+    print("🎯 Precisión frente al corpus de regresión")
+    for name, image in pages.items():
+        if name not in corpus:
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            pil_image = processor._preprocess_image_pil(image)
+        cv_image, _, _ = image_preprocessing.preprocess(image, processor.preprocess_params)
+        pil_ratio, pil_fields, total = accuracy(pil_image, corpus[name])
+        cv_ratio, cv_fields, _ = accuracy(cv_image, corpus[name])
+        print(f"   {name}: similitud PIL {pil_ratio:.3f} / OpenCV {cv_ratio:.3f}, "
+              f"campos PIL {pil_fields}/{total} / OpenCV {cv_fields}/{total}")
+
+
+def benchmark_dpi(iterations):
+    """Rasterizado de las páginas de pdfs/: RGB a DPI fijo vs grises con DPI adaptativo.
+
+    Con Tesseract instalado también compara el OCR de ambas imágenes contra
+    la capa de texto del PDF (similitud de difflib).
+    """
+    import difflib
+    import fitz
+    import pytesseract
+    from PIL import Image
+    from invoice_processor import processor
+
+    try:
+        pytesseract.get_tesseract_version()
+        ocr_available = True
+    except Exception:
+        ocr_available = False
+        print("⚠️  Tesseract no disponible: sólo tiempos y memoria, sin precisión")
+
+    def fixed(page):
+        # Comportamiento anterior: RGB a la resolución máxima, pasando por PPM
+        zoom = processor.pdf_dpi / 72
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+        return Image.open(io.BytesIO(pix.tobytes("ppm"))), len(pix.samples_mv)
+
+    def adaptive(page):
+        pix, dpi = processor._render_page(page)
+        return Image.frombytes("L", (pix.width, pix.height), pix.samples, "raw", "L", pix.stride), dpi
+
+    def similarity(image, reference):
+        """(ms de OCR, similitud con la capa de texto)"""
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            text = processor._ocr(processor._preprocess_image(image))
+        elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, difflib.SequenceMatcher(None, " ".join(text.split()), reference).ratio()
+
+    iterations = max(1, iterations // 20)
+    print(f"🖨️  Rasterizado de PDF ({iterations} iteraciones por página)")
+    for name in sorted(os.listdir("pdfs")):
+        if not name.lower().endswith('.pdf'):
+            continue
+        with fitz.open(os.path.join("pdfs", name)) as doc:
+            for page in doc:
+                fixed_ms = _timeit(lambda: fixed(page), iterations)
+                adaptive_ms = _timeit(lambda: adaptive(page), iterations)
+                fixed_image, fixed_bytes = fixed(page)
+                adaptive_image, dpi = adaptive(page)
+                adaptive_bytes = adaptive_image.size[0] * adaptive_image.size[1]
+                line = (f"   {name} p{page.number + 1}: {processor.pdf_dpi} DPI RGB {fixed_ms:.1f} ms "
+                        f"{fixed_bytes / 2**20:.1f} MB -> {dpi} DPI gris {adaptive_ms:.1f} ms "
+                        f"{adaptive_bytes / 2**20:.1f} MB")
+                if ocr_available:
+                    reference = " ".join(page.get_text().split())
+                    fixed_ocr_ms, fixed_ratio = similarity(fixed_image, reference)
+                    adaptive_ocr_ms, adaptive_ratio = similarity(adaptive_image, reference)
+                    line += (f" | OCR {fixed_ocr_ms:.0f} -> {adaptive_ocr_ms:.0f} ms, "
+                             f"similitud {fixed_ratio:.3f} -> {adaptive_ratio:.3f}")
+                print(line)
+
+
+def benchmark_engines(iterations):
+    """Páginas por segundo: pytesseract (subproceso por página), tesserocr sin pool y con pool"""
+    import pytesseract
+    import config
+    import ocr_engine
+    from invoice_processor import processor
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pages = [processor._preprocess_image(image) for image in _sample_pages().values()]
+    count = max(len(pages), iterations // 20)
+    batch = [pages[n % len(pages)] for n in range(count)]
+
+    def throughput(recognize):
+        start = time.perf_counter()
+        for image in batch:
+            recognize(image)
+        return len(batch) / (time.perf_counter() - start)
+
+    print(f"🔤 Motores OCR ({len(batch)} páginas, PSM 3, un worker)")
+    try:
+        pytesseract.get_tesseract_version()
+        rate = throughput(lambda image: pytesseract.image_to_string(image, lang='spa'))
+        print(f"   pytesseract:          {rate:.2f} páginas/s")
+    except Exception as e:
+        print(f"   pytesseract:          no disponible ({e})")
+
+    if not ocr_engine.TESSEROCR_AVAILABLE:
+        print("   tesserocr:            no instalado (pip install tesserocr)")
+        return
+
+    def cold(image):
+        engine = ocr_engine.TesseractEngine('spa', config.Config.TESSDATA_PREFIX)
+        try:
+            return engine.recognize(image, 3, processor.ocr_timeout)
+        finally:
+            engine.close()
+
+    pool = ocr_engine.EnginePool('spa', config.Config.TESSDATA_PREFIX)
+    pool.warm()
+
+    def warm(image):
+        with pool.acquire() as engine:
+            return engine.recognize(image, 3, processor.ocr_timeout)
+
+    print(f"   tesserocr sin pool:   {throughput(cold):.2f} páginas/s")
+    print(f"   tesserocr con pool:   {throughput(warm):.2f} páginas/s {pool.stats()}")
+
+
+BENCHMARKS = {
+    "email": benchmark_email,
+    "engines": benchmark_engines,
+    "dpi": benchmark_dpi,
+    "parser": benchmark_parser,
+    "preprocess": benchmark_preprocess
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks del sistema de facturas")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args.iterations)
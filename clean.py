@@ -12,6 +12,20 @@ def clean_database():
         os.rename(data_file, backup_file)
         print(f"✅ Backup creado: {backup_file}")
     
+    # Log append-only (backend "log"): sin esto se reproduciría al arrancar
+    for log_file in ("invoices_log.jsonl", "invoices_log.jsonl.old"):
+        if os.path.exists(log_file):
+            backup_log = f"{log_file}_backup_{os.path.getmtime(log_file)}"
+            os.rename(log_file, backup_log)
+            print(f"✅ Backup de log creado: {backup_log}")
+    
+    # Backend SQLite (con sus archivos WAL)
+    for db_file in ("invoices.db", "invoices.db-wal", "invoices.db-shm"):
+        if os.path.exists(db_file):
+            backup_db = f"{db_file}_backup_{os.path.getmtime(db_file)}"
+            os.rename(db_file, backup_db)
+            print(f"✅ Backup de SQLite creado: {backup_db}")
+    
     # Crear archivo vacío
     with open(data_file, 'w', encoding='utf-8') as f:
         json.dump({}, f, indent=2)
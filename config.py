@@ -6,16 +6,109 @@ load_dotenv()
 class Config:
     # Tesseract OCR
     TESSERACT_PATH = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
-    
+    # Motor: auto (tesserocr si está instalado) | tesserocr | pytesseract
+    OCR_ENGINE = os.getenv("OCR_ENGINE", "auto")
+    # Carpeta tessdata para tesserocr (vacío = la de la instalación)
+    TESSDATA_PREFIX = os.getenv("TESSDATA_PREFIX")
+    # Pool de motores tesserocr por worker: reciclado tras N páginas y comprobación tras inactividad
+    OCR_ENGINE_MAX_PAGES = int(os.getenv("OCR_ENGINE_MAX_PAGES", "500"))
+    OCR_ENGINE_HEALTH_SECONDS = int(os.getenv("OCR_ENGINE_HEALTH_SECONDS", "300"))
+
+    # Ejecutor OCR: process | thread | inline
+    OCR_EXECUTOR_MODE = os.getenv("OCR_EXECUTOR_MODE", "process")
+    OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+    OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "32"))
+    # Segundos por trabajo (incluye la espera en cola)
+    OCR_JOB_TIMEOUT = int(os.getenv("OCR_JOB_TIMEOUT", "120"))
+    # Páginas de un mismo PDF procesadas en paralelo
+    PDF_PAGE_CONCURRENCY = int(os.getenv("PDF_PAGE_CONCURRENCY", "4"))
+    # Rasterizado adaptativo: se renderiza a PDF_DPI_MIN y se sube (hasta PDF_DPI_MAX) sólo
+    # si la altura de las líneas de texto queda por debajo de PDF_TEXT_HEIGHT_PX
+    PDF_DPI_MIN = int(os.getenv("PDF_DPI_MIN", "150"))
+    PDF_DPI_MAX = int(os.getenv("PDF_DPI_MAX", "300"))
+    PDF_TEXT_HEIGHT_PX = int(os.getenv("PDF_TEXT_HEIGHT_PX", "28"))
+    # Capa de texto embebida: se usa si la página tiene al menos N caracteres legibles
+    PDF_TEXT_LAYER_ENABLED = os.getenv("PDF_TEXT_LAYER_ENABLED", "true").lower() == "true"
+    PDF_TEXT_LAYER_MIN_CHARS = int(os.getenv("PDF_TEXT_LAYER_MIN_CHARS", "50"))
+    # Configuraciones PSM en paralelo por imagen y score que permite cortar antes
+    OCR_PSM_PARALLELISM = int(os.getenv("OCR_PSM_PARALLELISM", "4"))
+    OCR_QUALITY_THRESHOLD = float(os.getenv("OCR_QUALITY_THRESHOLD", "25"))
+    # OCR por regiones: pasada de diseño a baja resolución y relectura sólo de las zonas con campos
+    OCR_ROI_ENABLED = os.getenv("OCR_ROI_ENABLED", "false").lower() == "true"
+    OCR_ROI_SCALE = float(os.getenv("OCR_ROI_SCALE", "0.4"))
+    OCR_ROI_PADDING = int(os.getenv("OCR_ROI_PADDING", "4"))
+    OCR_ROI_MIN_KEYWORDS = int(os.getenv("OCR_ROI_MIN_KEYWORDS", "2"))
+    PSM_STATS_FILE = "psm_stats.json"
+    # Preprocesamiento: pil (cadena original) | opencv (vectorizado, pasos según la imagen).
+    # El cambio de opencv a valor por defecto queda aplazado hasta compararlo con PIL
+    # sobre el corpus de regresión con Tesseract (python benchmark.py preprocess)
+    OCR_PREPROCESS_ENGINE = os.getenv("OCR_PREPROCESS_ENGINE", "pil")
+    # Plantillas de extracción por proveedor (ver supplier_templates.example.json)
+    SUPPLIER_TEMPLATES_FILE = os.getenv("SUPPLIER_TEMPLATES_FILE", "supplier_templates.json")
+    SUPPLIER_DETECT_LINES = int(os.getenv("SUPPLIER_DETECT_LINES", "15"))
+
+    # Imágenes de página para depuración/auditoría (sólo si DEBUG_ARTIFACTS; escritura en segundo plano)
+    DEBUG_ARTIFACTS = os.getenv("DEBUG_ARTIFACTS", "false").lower() == "true"
+    ARTIFACTS_BACKEND = os.getenv("ARTIFACTS_BACKEND", "local")
+    ARTIFACTS_FOLDER = os.getenv("ARTIFACTS_FOLDER", "pdf_images")
+    ARTIFACTS_MAX_MB = int(os.getenv("ARTIFACTS_MAX_MB", "200"))
+    ARTIFACTS_MAX_AGE_HOURS = int(os.getenv("ARTIFACTS_MAX_AGE_HOURS", "72"))
+    ARTIFACTS_MAX_PENDING = int(os.getenv("ARTIFACTS_MAX_PENDING", "16"))
+
+    # Caché OCR direccionada por contenido (LRU acotada por tamaño)
+    OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+    OCR_CACHE_FOLDER = "ocr_cache"
+    OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", "256"))
+
+    # Cola de trabajos asíncronos (ingesta con 202 Accepted)
+    JOBS_DATA_FILE = "jobs_data.json"
+    JOBS_LOG_FILE = "jobs_log.jsonl"
+    # Como mucho un guardado del progreso (etapa) de cada trabajo cada N segundos
+    JOB_PROGRESS_SAVE_SECONDS = int(os.getenv("JOB_PROGRESS_SAVE_SECONDS", "5"))
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", str(os.cpu_count() or 1)))
+    JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+    JOB_RETENTION_HOURS = int(os.getenv("JOB_RETENTION_HOURS", "72"))
+
     # Database
     MONGODB_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     DATABASE_NAME = "invoice_system"
+    # Backend local: json (reescritura completa) | log (append-only con compactación) | sqlite
+    DB_BACKEND = os.getenv("DB_BACKEND", "log")
+    DB_SQLITE_PATH = os.getenv("DB_SQLITE_PATH", "invoices.db")
+    DB_LOG_FILE = "invoices_log.jsonl"
+    DB_LOG_COMPACT_AFTER = int(os.getenv("DB_LOG_COMPACT_AFTER", "1000"))
     
     # Email - GMAIL
     EMAIL_USER = os.getenv("EMAIL_USER")
     EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
     SMTP_SERVER = os.getenv("SMTP_SERVER", "smtp.gmail.com")
     SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
+    # Desactivar STARTTLS/AUTH permite probar contra un SMTP local (ej. aiosmtpd)
+    SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    SMTP_AUTH = os.getenv("SMTP_AUTH", "true").lower() == "true"
+    # Pool de conexiones SMTP y envío por lotes
+    SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+    SMTP_BATCH_SIZE = int(os.getenv("SMTP_BATCH_SIZE", "20"))
+    SMTP_IDLE_TIMEOUT = int(os.getenv("SMTP_IDLE_TIMEOUT", "60"))
+    SMTP_MAX_BACKOFF = int(os.getenv("SMTP_MAX_BACKOFF", "60"))
+    # Bandeja de salida persistente (reintentos con backoff y fallidos definitivos)
+    EMAIL_OUTBOX_FILE = "email_outbox.json"
+    EMAIL_OUTBOX_LOG_FILE = "email_outbox_log.jsonl"
+    EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+    EMAIL_RETRY_BASE_SECONDS = int(os.getenv("EMAIL_RETRY_BASE_SECONDS", "30"))
+    EMAIL_RETRY_MAX_SECONDS = int(os.getenv("EMAIL_RETRY_MAX_SECONDS", "3600"))
+    # Retención de los fallidos definitivos: como mucho N emails y N días
+    EMAIL_DEAD_LETTER_MAX = int(os.getenv("EMAIL_DEAD_LETTER_MAX", "500"))
+    EMAIL_DEAD_LETTER_DAYS = int(os.getenv("EMAIL_DEAD_LETTER_DAYS", "30"))
+    # Bytecode compilado de las plantillas Jinja2
+    EMAIL_TEMPLATE_CACHE_FOLDER = "template_cache"
+    # Resumen por aprobador en lugar de un email por factura
+    EMAIL_DIGEST_ENABLED = os.getenv("EMAIL_DIGEST_ENABLED", "false").lower() == "true"
+    EMAIL_DIGEST_FILE = "email_digest.json"
+    EMAIL_DIGEST_LOG_FILE = "email_digest_log.jsonl"
+    # Se envía al juntar N facturas o cuando la más antigua cumple el intervalo
+    EMAIL_DIGEST_MAX_ITEMS = int(os.getenv("EMAIL_DIGEST_MAX_ITEMS", "50"))
+    EMAIL_DIGEST_INTERVAL_MINUTES = int(os.getenv("EMAIL_DIGEST_INTERVAL_MINUTES", "1440"))
     
     # API
     BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
@@ -23,9 +116,28 @@ class Config:
     # File Upload
     UPLOAD_FOLDER = "uploads"
     ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg'}
+    # Subidas copiadas a disco por bloques, con límite de tamaño
+    UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "100"))
+    UPLOAD_CHUNK_KB = int(os.getenv("UPLOAD_CHUNK_KB", "1024"))
+    # Lotes (/api/upload-invoices/batch): archivos por lote, tamaño total y OCR en paralelo
+    BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "500"))
+    BATCH_MAX_MB = int(os.getenv("BATCH_MAX_MB", "1024"))
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    # Carpeta vigilada: ingesta automática de lo que dejan los escáneres
+    HOT_FOLDER_ENABLED = os.getenv("HOT_FOLDER_ENABLED", "false").lower() == "true"
+    HOT_FOLDER_PATH = os.getenv("HOT_FOLDER_PATH", "hot_folder")
+    # Por defecto, subcarpetas "procesados" y "fallidos" de la carpeta vigilada
+    HOT_FOLDER_DONE = os.getenv("HOT_FOLDER_DONE")
+    HOT_FOLDER_FAILED = os.getenv("HOT_FOLDER_FAILED")
+    HOT_FOLDER_STATE_FILE = "hot_folder_state.json"
+    HOT_FOLDER_POLL_SECONDS = int(os.getenv("HOT_FOLDER_POLL_SECONDS", "5"))
+    # Segundos sin cambios de tamaño/mtime para considerar que el escáner terminó
+    HOT_FOLDER_STABLE_SECONDS = int(os.getenv("HOT_FOLDER_STABLE_SECONDS", "10"))
+    HOT_FOLDER_WORKERS = int(os.getenv("HOT_FOLDER_WORKERS", "2"))
     
     # Email del aprobador por defecto
     DEFAULT_APPROVER_EMAIL = "rojas.diego3011@gmail.com"
+    HOT_FOLDER_APPROVER_EMAIL = os.getenv("HOT_FOLDER_APPROVER_EMAIL", DEFAULT_APPROVER_EMAIL)
 
 print("✅ Sistema Gmail configurado")
 print(f"📧 Email: {Config.EMAIL_USER}")
\ No newline at end of file
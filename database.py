@@ -1,12 +1,185 @@
 # database.py
 from datetime import datetime
+import base64
+import bisect
 import json
 import os
+import sqlite3
+import threading
+import config
 
-class DatabaseSimple:
+def normalize_date(value):
+    """Convertir 'dd/mm/aaaa' (o 'dd-mm-aa') a 'aaaa-mm-dd'; None si no se reconoce"""
+    if not isinstance(value, str):
+        return None
+    for fmt in ('%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y', '%d-%m-%y'):
+        try:
+            return datetime.strptime(value.strip(), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+def to_amount(value):
+    """Monto como float, o None si no es numérico"""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+# Longitud máxima de cada parte del cursor (fecha ISO e id)
+CURSOR_FIELD_MAX = 64
+
+def encode_cursor(created_at, invoice_id):
+    """Cursor opaco a partir de la clave de orden (created_at, id)"""
+    raw = json.dumps([created_at, invoice_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def decode_cursor(cursor):
+    """Clave de orden de un cursor; lanza ValueError si es inválido"""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError(f"Cursor inválido: {cursor}")
+    # Un cursor bien codificado pero manipulado no debe llegar a la comparación del keyset
+    if (not isinstance(key, list) or len(key) != 2
+            or not all(isinstance(part, str) and len(part) <= CURSOR_FIELD_MAX for part in key)):
+        raise ValueError(f"Cursor inválido: {cursor}")
+    created_at, invoice_id = key
+    return created_at, invoice_id
+
+def parse_filter_date(value):
+    """Fecha de un filtro en formato AAAA-MM-DD (None si no se indica); lanza ValueError si es inválida"""
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date().isoformat()
+    except ValueError:
+        raise ValueError(f"Fecha inválida: {value} (formato AAAA-MM-DD)")
+
+def matches_filters(invoice, filters):
+    """Filtros de list_invoices: status, proveedor, fecha_desde/hasta (ISO), monto_min/max"""
+    if filters.get('status') and invoice.get('status') != filters['status']:
+        return False
+    if filters.get('proveedor') and invoice.get('proveedor') != filters['proveedor']:
+        return False
+    if filters.get('fecha_desde') or filters.get('fecha_hasta'):
+        fecha = normalize_date(invoice.get('fecha_emision'))
+        if fecha is None:
+            return False
+        if filters.get('fecha_desde') and fecha < filters['fecha_desde']:
+            return False
+        if filters.get('fecha_hasta') and fecha > filters['fecha_hasta']:
+            return False
+    if filters.get('monto_min') is not None or filters.get('monto_max') is not None:
+        monto = to_amount(invoice.get('monto_total'))
+        if monto is None:
+            return False
+        if filters.get('monto_min') is not None and monto < filters['monto_min']:
+            return False
+        if filters.get('monto_max') is not None and monto > filters['monto_max']:
+            return False
+    return True
+
+def project_fields(invoice_id, invoice, fields):
+    """Subconjunto de campos de una factura (siempre incluye _id)"""
+    if not fields:
+        return invoice
+    projected = {key: invoice[key] for key in fields if key in invoice}
+    projected['_id'] = invoice_id
+    return projected
+
+class InvoiceStats:
+    """Agregados de /api/stats mantenidos de forma incremental.
+    
+    Cada factura aporta a los contadores según su estado; al cambiar de
+    estado se resta su aporte anterior y se suma el nuevo.
+    
+    En los backends json y log viven en la memoria del proceso: se
+    reconstruyen recorriendo las facturas al arrancar y no ven lo que
+    escriba otro proceso. SQLite los guarda en tablas propias actualizadas
+    en la misma transacción que cada alta o cambio (ver to_rows/from_rows).
+    """
+    
     def __init__(self):
-        self.data_file = "invoices_data.json"
+        self.total = 0
+        self.por_estado = {"En Proceso": 0, "Aprobado": 0, "Rechazado": 0}
+        self.monto_aprobado = 0.0
+        self.rechazos_con_comentarios = 0
+        self.por_dia = {}
+    
+    def _apply(self, invoice, sign):
+        status = invoice.get('status', 'En Proceso')
+        self.por_estado[status] = self.por_estado.get(status, 0) + sign
+        
+        # Sumar montos de facturas aprobadas
+        if status == "Aprobado" and invoice.get('monto_total'):
+            amount = to_amount(invoice['monto_total'])
+            if amount is not None:
+                self.monto_aprobado += sign * amount
+        
+        # Contar rechazos con comentarios
+        if status == "Rechazado" and invoice.get('rejection_comments'):
+            self.rechazos_con_comentarios += sign
+    
+    def add_invoice(self, invoice):
+        self.total += 1
+        day = invoice.get('created_at', '')[:10]
+        self.por_dia[day] = self.por_dia.get(day, 0) + 1
+        self._apply(invoice, 1)
+    
+    def remove_invoice(self, invoice):
+        self.total -= 1
+        day = invoice.get('created_at', '')[:10]
+        self.por_dia[day] = self.por_dia.get(day, 0) - 1
+        self._apply(invoice, -1)
+    
+    def update_invoice(self, before, after):
+        self._apply(before, -1)
+        self._apply(after, 1)
+    
+    def to_rows(self):
+        """(contadores [(clave, valor)], días [(día, facturas)]) para las tablas de SQLite"""
+        counters = [('total', self.total), ('monto_aprobado', self.monto_aprobado),
+                    ('rechazos_con_comentarios', self.rechazos_con_comentarios)]
+        counters += [(f"estado:{status}", count) for status, count in self.por_estado.items()]
+        return counters, list(self.por_dia.items())
+    
+    @classmethod
+    def from_rows(cls, counters, days):
+        stats = cls()
+        for key, value in counters:
+            if key.startswith('estado:'):
+                stats.por_estado[key[len('estado:'):]] = int(value)
+            elif key == 'monto_aprobado':
+                stats.monto_aprobado = value
+            elif key in ('total', 'rechazos_con_comentarios'):
+                setattr(stats, key, int(value))
+        stats.por_dia = {day: count for day, count in days if count}
+        return stats
+    
+    def snapshot(self):
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+        return {
+            "total_facturas": self.total,
+            "por_estado": {status: count for status, count in self.por_estado.items()
+                           if count or status in ("En Proceso", "Aprobado", "Rechazado")},
+            "monto_total_aprobado": round(self.monto_aprobado, 2),
+            "rechazos_con_comentarios": self.rechazos_con_comentarios,
+            "facturas_procesadas_hoy": self.por_dia.get(today, 0),
+            "facturas_por_dia": dict(sorted(self.por_dia.items())[-7:])
+        }
+
+class DatabaseSimple:
+    def __init__(self, data_file="invoices_data.json"):
+        self.data_file = data_file
         self.invoices = self._load_data()
+        # Índice ordenado (created_at, id) para paginar sin ordenar el diccionario
+        self._order = sorted((invoice.get('created_at', ''), invoice_id)
+                             for invoice_id, invoice in self.invoices.items())
+        # Índice hash_contenido -> id para detectar un mismo archivo ya guardado
+        self._by_hash = {invoice['hash_contenido']: invoice_id
+                         for invoice_id, invoice in self.invoices.items() if invoice.get('hash_contenido')}
+        self.rebuild_stats()
         print("✅ Base de datos simple inicializada (JSON)")
     
     def _load_data(self):
@@ -31,6 +204,16 @@ class DatabaseSimple:
         except Exception as e:
             print(f"❌ Error guardando datos: {e}")
     
+    def _store_new(self, invoice_id, invoice_data):
+        """Registrar una factura nueva y persistirla"""
+        self.invoices[invoice_id] = invoice_data
+        self._save_data()
+    
+    def _store_update(self, invoice_id, fields):
+        """Aplicar cambios a una factura y persistirlos"""
+        self.invoices[invoice_id].update(fields)
+        self._save_data()
+    
     def save_invoice(self, invoice_data):
         """Guardar nueva factura"""
         try:
@@ -46,8 +229,9 @@ class DatabaseSimple:
                 'comments': "Factura creada y enviada para aprobación"
             }]
             
-            self.invoices[invoice_id] = invoice_data
-            self._save_data()
+            self._store_new(invoice_id, invoice_data)
+            self._index_new(invoice_id, invoice_data)
+            self._stats_new(invoice_data)
             
             print(f"💾 Factura guardada con ID: {invoice_id}")
             return invoice_id
@@ -58,14 +242,17 @@ class DatabaseSimple:
     def update_invoice_status(self, invoice_id, status, comments=None):
         """Actualizar estado de factura con historial"""
         try:
-            if invoice_id in self.invoices:
-                self.invoices[invoice_id]['status'] = status
-                self.invoices[invoice_id]['updated_at'] = datetime.utcnow().isoformat()
+            invoice = self.get_invoice(invoice_id)
+            if invoice:
+                fields = {
+                    'status': status,
+                    'updated_at': datetime.utcnow().isoformat()
+                }
                 
                 # Guardar comentarios de rechazo
                 if comments and comments != "Sin comentarios específicos":
-                    self.invoices[invoice_id]['rejection_comments'] = comments
-                    self.invoices[invoice_id]['rejected_at'] = datetime.utcnow().isoformat()
+                    fields['rejection_comments'] = comments
+                    fields['rejected_at'] = datetime.utcnow().isoformat()
                 
                 # Agregar al historial
                 history_entry = {
@@ -76,8 +263,10 @@ class DatabaseSimple:
                 if comments:
                     history_entry['comments'] = comments
                 
-                self.invoices[invoice_id]['status_history'].append(history_entry)
-                self._save_data()
+                fields['status_history'] = invoice['status_history'] + [history_entry]
+                before = dict(invoice)
+                self._store_update(invoice_id, fields)
+                self._stats_update(before, {**before, **fields})
                 
                 print(f"✅ Estado actualizado: {invoice_id} -> {status}")
                 return True
@@ -113,6 +302,425 @@ class DatabaseSimple:
             if invoice.get('status') == status:
                 filtered[invoice_id] = invoice
         return filtered
+    
+    def get_invoices_by_supplier(self, proveedor):
+        """Obtener facturas de un proveedor"""
+        filtered = {}
+        for invoice_id, invoice in self.invoices.items():
+            if invoice.get('proveedor') == proveedor:
+                filtered[invoice_id] = invoice
+        return filtered
+    
+    def get_all_invoices(self):
+        """Obtener todas las facturas"""
+        return self.invoices
+    
+    def find_invoice_by_hash(self, content_hash):
+        """ID de la factura creada a partir de un contenido (hash_contenido), o None"""
+        return self._by_hash.get(content_hash)
+    
+    def _index_new(self, invoice_id, invoice_data):
+        """Agregar una factura nueva a los índices de paginación y de contenido"""
+        bisect.insort(self._order, (invoice_data['created_at'], invoice_id))
+        if invoice_data.get('hash_contenido'):
+            self._by_hash[invoice_data['hash_contenido']] = invoice_id
+    
+    def _stats_new(self, invoice_data):
+        self.stats.add_invoice(invoice_data)
+    
+    def _stats_update(self, before, after):
+        self.stats.update_invoice(before, after)
+    
+    def count_invoices(self):
+        """Número total de facturas"""
+        return len(self.invoices)
+    
+    def _iter_invoices(self):
+        return iter(self.invoices.values())
+    
+    def get_stats(self):
+        """Estadísticas agregadas en O(1)"""
+        return self.stats.snapshot()
+    
+    def rebuild_stats(self):
+        """Recalcular los agregados desde cero (por si se desincronizan)"""
+        stats = InvoiceStats()
+        for invoice in self._iter_invoices():
+            stats.add_invoice(invoice)
+        self.stats = stats
+        return stats.snapshot()
+    
+    def list_invoices(self, limit=50, cursor=None, filters=None, fields=None):
+        """Página de facturas en orden de creación a partir de un cursor
+        
+        Devuelve (facturas, next_cursor); next_cursor es None en la última página.
+        """
+        filters = filters or {}
+        start = bisect.bisect_right(self._order, decode_cursor(cursor)) if cursor else 0
+        
+        page = {}
+        last_key = None
+        for position in range(start, len(self._order)):
+            created_at, invoice_id = self._order[position]
+            invoice = self.invoices.get(invoice_id)
+            if invoice is None or not matches_filters(invoice, filters):
+                continue
+            if len(page) == limit:
+                return page, encode_cursor(*last_key)
+            page[invoice_id] = project_fields(invoice_id, invoice, fields)
+            last_key = (created_at, invoice_id)
+        return page, None
+
+class DatabaseLog(DatabaseSimple):
+    """Misma interfaz que DatabaseSimple con escritura append-only.
+    
+    Cada alta o cambio de estado es una línea JSON con fsync en el log; al
+    arrancar se carga el último snapshot y se reproduce el log encima. Los
+    registros son idempotentes (put/set), así que reproducirlos dos veces es
+    seguro. La compactación reescribe el snapshot en un hilo de fondo.
+    """
+    
+    def __init__(self, data_file="invoices_data.json", log_file="invoices_log.jsonl", compact_after=1000):
+        self.log_file = log_file
+        self.rotated_log_file = f"{log_file}.old"
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._log_records = 0
+        self._compacting = False
+        super().__init__(data_file)
+        
+        # Una compactación interrumpida: consolidar antes de aceptar escrituras
+        if os.path.exists(self.rotated_log_file):
+            self._write_snapshot(json.dumps(self.invoices, indent=2, ensure_ascii=False, default=str))
+            os.remove(self.rotated_log_file)
+        
+        self._log = open(self.log_file, 'a', encoding='utf-8')
+        print(f"✅ Log append-only activo: {self.log_file} ({self._log_records} registros pendientes de compactar)")
+    
+    def _load_data(self):
+        """Cargar snapshot y reproducir los logs encima"""
+        data = super()._load_data()
+        for path in (self.rotated_log_file, self.log_file):
+            self._log_records += self._replay(path, data)
+        return data
+    
+    def _replay(self, path, data):
+        if not os.path.exists(path):
+            return 0
+        
+        self._repair_tail(path)
+        count = 0
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️  Registro ilegible en {path}:{line_number}, se omite")
+                    continue
+                self._apply(data, record)
+                count += 1
+        print(f"📜 {count} registros reproducidos desde {path}")
+        return count
+    
+    def _repair_tail(self, path):
+        """Recortar una última línea incompleta (caída a mitad de escritura)"""
+        with open(path, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                f.truncate(content.rfind(b'\n') + 1)
+                print(f"⚠️  Registro incompleto descartado al final de {path}")
+    
+    def _apply(self, data, record):
+        if record['op'] == 'put':
+            data[record['id']] = record['data']
+        elif record['op'] == 'set' and record['id'] in data:
+            data[record['id']].update(record['fields'])
+    
+    def _append(self, record):
+        """Escribir un registro con fsync; O(1) sin importar el tamaño del historial"""
+        self._log.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._log_records += 1
+        
+        if self._log_records >= self.compact_after and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._compact, name="db-compaction", daemon=True).start()
+    
+    def _store_new(self, invoice_id, invoice_data):
+        with self._lock:
+            self.invoices[invoice_id] = invoice_data
+            self._append({'op': 'put', 'id': invoice_id, 'data': invoice_data})
+    
+    def _store_update(self, invoice_id, fields):
+        with self._lock:
+            self.invoices[invoice_id].update(fields)
+            self._append({'op': 'set', 'id': invoice_id, 'fields': fields})
+    
+    def _compact(self):
+        """Rotar el log, escribir un snapshot nuevo y descartar el log rotado"""
+        try:
+            with self._lock:
+                self._log.close()
+                os.replace(self.log_file, self.rotated_log_file)
+                self._log = open(self.log_file, 'a', encoding='utf-8')
+                self._log_records = 0
+                # Copia superficial por factura (las actualizaciones reemplazan campos, no los
+                # modifican): el estado es consistente y las escrituras sólo esperan a la copia
+                invoices = {invoice_id: dict(invoice) for invoice_id, invoice in self.invoices.items()}
+            
+            self._write_snapshot(json.dumps(invoices, indent=2, ensure_ascii=False, default=str))
+            os.remove(self.rotated_log_file)
+            print(f"🗜️  Log compactado en {self.data_file}")
+        except Exception as e:
+            print(f"❌ Error compactando log: {e}")
+        finally:
+            self._compacting = False
+    
+    def _write_snapshot(self, snapshot):
+        tmp_file = f"{self.data_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.data_file)
+
+class DatabaseSQLite(DatabaseSimple):
+    """Implementación de la API de DatabaseSimple sobre SQLite (modo WAL).
+    
+    La factura completa se guarda como JSON en la columna data; los campos
+    consultados (estado, proveedor, fechas, número) van además en columnas
+    indexadas. No mantiene las facturas en memoria.
+    """
+    
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS invoices (
+            id TEXT PRIMARY KEY,
+            status TEXT,
+            proveedor TEXT,
+            numero_factura TEXT,
+            fecha_emision TEXT,
+            monto_total REAL,
+            created_at TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_invoices_status ON invoices(status, created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_invoices_proveedor ON invoices(proveedor, created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_invoices_fecha_emision ON invoices(fecha_emision);
+        CREATE INDEX IF NOT EXISTS idx_invoices_created_at ON invoices(created_at, id);
+        CREATE INDEX IF NOT EXISTS idx_invoices_numero_factura ON invoices(numero_factura);
+        CREATE INDEX IF NOT EXISTS idx_invoices_hash ON invoices(json_extract(data, '$.hash_contenido'));
+        CREATE TABLE IF NOT EXISTS invoice_stats (key TEXT PRIMARY KEY, value REAL NOT NULL);
+        CREATE TABLE IF NOT EXISTS invoice_stats_days (day TEXT PRIMARY KEY, count INTEGER NOT NULL);
+    """
+    
+    def __init__(self, db_path="invoices.db"):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+        # Las tablas de agregados se rellenan una sola vez (base creada antes de existir)
+        with self._lock:
+            has_stats = self._conn.execute("SELECT 1 FROM invoice_stats WHERE key = 'total'").fetchone()
+        if not has_stats:
+            self.rebuild_stats()
+        print(f"✅ Base de datos SQLite inicializada: {db_path} ({self.count_invoices()} facturas)")
+    
+    def _row_values(self, invoice_id, invoice):
+        """Valores de las columnas indexadas + JSON completo"""
+        return (
+            invoice_id,
+            invoice.get('status'),
+            invoice.get('proveedor'),
+            str(invoice.get('numero_factura')) if invoice.get('numero_factura') is not None else None,
+            normalize_date(invoice.get('fecha_emision')),
+            to_amount(invoice.get('monto_total')),
+            invoice.get('created_at'),
+            json.dumps(invoice, ensure_ascii=False, default=str)
+        )
+    
+    def _query(self, where="", params=()):
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, data FROM invoices {where} ORDER BY created_at, id", params
+            ).fetchall()
+        return {invoice_id: json.loads(data) for invoice_id, data in rows}
+    
+    def _store_new(self, invoice_id, invoice_data):
+        self.import_invoices({invoice_id: invoice_data})
+    
+    def _store_update(self, invoice_id, fields):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT data FROM invoices WHERE id = ?", (invoice_id,)).fetchone()
+            before = json.loads(row[0])
+            invoice = {**before, **fields}
+            self._conn.execute(
+                """UPDATE invoices SET status = ?, proveedor = ?, numero_factura = ?, fecha_emision = ?,
+                   monto_total = ?, created_at = ?, data = ? WHERE id = ?""",
+                self._row_values(invoice_id, invoice)[1:] + (invoice_id,)
+            )
+            delta = InvoiceStats()
+            delta.update_invoice(before, invoice)
+            self._add_stats(delta)
+    
+    def import_invoices(self, invoices):
+        """Insertar (o reemplazar) varias facturas en una sola transacción"""
+        with self._lock, self._conn:
+            delta = InvoiceStats()
+            for invoice_id, invoice in invoices.items():
+                row = self._conn.execute("SELECT data FROM invoices WHERE id = ?", (invoice_id,)).fetchone()
+                if row:
+                    delta.remove_invoice(json.loads(row[0]))
+                delta.add_invoice(invoice)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO invoices VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._row_values(invoice_id, invoice) for invoice_id, invoice in invoices.items()]
+            )
+            self._add_stats(delta)
+        return len(invoices)
+    
+    def _add_stats(self, delta):
+        """Sumar un delta a las tablas de agregados (dentro de la transacción en curso)"""
+        counters, days = delta.to_rows()
+        self._conn.executemany(
+            """INSERT INTO invoice_stats (key, value) VALUES (?, ?)
+               ON CONFLICT(key) DO UPDATE SET value = value + excluded.value""",
+            counters
+        )
+        self._conn.executemany(
+            """INSERT INTO invoice_stats_days (day, count) VALUES (?, ?)
+               ON CONFLICT(day) DO UPDATE SET count = count + excluded.count""",
+            days
+        )
+    
+    def _stats_new(self, invoice_data):
+        """Los agregados se actualizan en la transacción del INSERT"""
+    
+    def _stats_update(self, before, after):
+        """Los agregados se actualizan en la transacción del UPDATE"""
+    
+    @property
+    def stats(self):
+        """Agregados leídos de las tablas: incluyen lo que escriban otros procesos"""
+        with self._lock:
+            counters = self._conn.execute("SELECT key, value FROM invoice_stats").fetchall()
+            days = self._conn.execute("SELECT day, count FROM invoice_stats_days").fetchall()
+        return InvoiceStats.from_rows(counters, days)
+    
+    def rebuild_stats(self):
+        """Recalcular las tablas de agregados desde las facturas"""
+        with self._lock, self._conn:
+            # IMMEDIATE: ningún otro proceso escribe facturas mientras se recalcula
+            self._conn.execute("BEGIN IMMEDIATE")
+            stats = InvoiceStats()
+            for (data,) in self._conn.execute("SELECT data FROM invoices").fetchall():
+                stats.add_invoice(json.loads(data))
+            self._conn.execute("DELETE FROM invoice_stats")
+            self._conn.execute("DELETE FROM invoice_stats_days")
+            self._add_stats(stats)
+        return stats.snapshot()
+    
+    def get_invoice(self, invoice_id):
+        """Obtener factura por ID"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM invoices WHERE id = ?", (invoice_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_rejected_invoices(self):
+        """Obtener todas las facturas rechazadas"""
+        return self.get_invoices_by_status('Rechazado')
+    
+    def get_approved_invoices(self):
+        """Obtener todas las facturas aprobadas"""
+        return self.get_invoices_by_status('Aprobado')
+    
+    def get_invoices_by_status(self, status):
+        """Obtener facturas por estado (usa idx_invoices_status)"""
+        return self._query("WHERE status = ?", (status,))
+    
+    def get_invoices_by_supplier(self, proveedor):
+        """Obtener facturas de un proveedor (usa idx_invoices_proveedor)"""
+        return self._query("WHERE proveedor = ?", (proveedor,))
+    
+    def get_all_invoices(self):
+        """Obtener todas las facturas"""
+        return self._query()
+    
+    def find_invoice_by_hash(self, content_hash):
+        """ID de la factura creada a partir de un contenido (usa idx_invoices_hash)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM invoices WHERE json_extract(data, '$.hash_contenido') = ? LIMIT 1",
+                (content_hash,)
+            ).fetchone()
+        return row[0] if row else None
+    
+    def _index_new(self, invoice_id, invoice_data):
+        """Los índices los mantiene SQLite"""
+    
+    def count_invoices(self):
+        """Número total de facturas"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM invoice_stats WHERE key = 'total'").fetchone()
+        return int(row[0]) if row else 0
+    
+    def list_invoices(self, limit=50, cursor=None, filters=None, fields=None):
+        """Página de facturas por keyset (created_at, id) usando los índices"""
+        filters = filters or {}
+        clauses, params = [], []
+        for column, operator, key in (
+            ('status', '=', 'status'),
+            ('proveedor', '=', 'proveedor'),
+            ('fecha_emision', '>=', 'fecha_desde'),
+            ('fecha_emision', '<=', 'fecha_hasta'),
+            ('monto_total', '>=', 'monto_min'),
+            ('monto_total', '<=', 'monto_max')
+        ):
+            if filters.get(key) is not None and filters.get(key) != '':
+                clauses.append(f"{column} {operator} ?")
+                params.append(filters[key])
+        if cursor:
+            clauses.append("(created_at, id) > (?, ?)")
+            params.extend(decode_cursor(cursor))
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, created_at, data FROM invoices {where} ORDER BY created_at, id LIMIT ?",
+                params + [limit + 1]
+            ).fetchall()
+        
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+        page = {invoice_id: project_fields(invoice_id, json.loads(data), fields)
+                for invoice_id, _, data in rows}
+        return page, next_cursor
+
+def create_database():
+    """Crear la base de datos según config.Config.DB_BACKEND"""
+    backend = config.Config.DB_BACKEND
+    if backend == "sqlite":
+        return DatabaseSQLite(config.Config.DB_SQLITE_PATH)
+    if backend == "log":
+        return DatabaseLog(log_file=config.Config.DB_LOG_FILE, compact_after=config.Config.DB_LOG_COMPACT_AFTER)
+    return DatabaseSimple()
+
+def __getattr__(name):
+    """Instancia global creada al primer uso (from database import db).
 
-# Instancia global
-db = DatabaseSimple()
\ No newline at end of file
+    Importar sólo las clases, como hace migrate_to_sqlite.py, no abre la
+    base de datos configurada ni crea sus archivos.
+    """
+    global db
+    if name == "db":
+        db = create_database()
+        return db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
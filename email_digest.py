@@ -0,0 +1,125 @@
+# email_digest.py
+import asyncio
+import time
+import uuid
+from json_store import JsonLogStore
+
+
+class DigestManager:
+    """Acumula las facturas pendientes de cada aprobador para enviarlas en un resumen.
+
+    Cada factura en espera es un registro en disco (JsonLogStore), así que
+    añadir una no reescribe las demás. El resumen de un aprobador se entrega
+    a flush_callback(to_email, facturas) cuando junta max_items facturas o
+    cuando la más antigua lleva interval segundos esperando, lo que ocurra
+    primero.
+    """
+
+    def __init__(self, data_file, log_file, max_items=50, interval=86400, poll_interval=60):
+        self.max_items = max(1, max_items)
+        self.interval = interval
+        self.poll_interval = poll_interval
+        self._store = JsonLogStore(data_file, log_file)
+        self.pending = {}  # to_email -> {'desde', 'facturas', 'claves'}
+        self._load()
+        self.digests_sent = 0
+        self.invoices_sent = 0
+        self._flush_callback = None
+        self._task = None
+        total = sum(len(digest['facturas']) for digest in self.pending.values())
+        print(f"✅ Resúmenes de aprobación inicializados ({total} facturas en espera)")
+
+    def _load(self):
+        """Reagrupar por aprobador las facturas guardadas"""
+        for key, record in list(self._store.data.items()):
+            if 'facturas' in record:
+                # Formato anterior: un registro por aprobador con todas sus facturas
+                self._store.delete(key)
+                for item in record['facturas']:
+                    self._put(key, item, record['desde'])
+                continue
+            self._group(key, record)
+
+    def _group(self, key, record):
+        digest = self.pending.setdefault(record['to_email'], {'desde': record['desde'], 'facturas': [], 'claves': []})
+        digest['desde'] = min(digest['desde'], record['desde'])
+        digest['facturas'].append(record['factura'])
+        digest['claves'].append(key)
+        return digest
+
+    def _put(self, to_email, item, since):
+        key = uuid.uuid4().hex
+        record = {'to_email': to_email, 'desde': since, 'factura': item}
+        try:
+            self._store.put(key, record)
+        except Exception as e:
+            print(f"❌ Error guardando factura del resumen de {to_email}: {e}")
+        return self._group(key, record)
+
+    def set_flush_callback(self, callback):
+        self._flush_callback = callback
+
+    def add(self, to_email, invoice_data, invoice_id):
+        """Añadir una factura al resumen del aprobador; lo envía si alcanza max_items"""
+        since = self.pending[to_email]['desde'] if to_email in self.pending else time.time()
+        digest = self._put(to_email, {'invoice_id': invoice_id, 'invoice_data': invoice_data}, since)
+        print(f"🗂️  Factura {invoice_id} añadida al resumen de {to_email} ({len(digest['facturas'])}/{self.max_items})")
+        if len(digest['facturas']) >= self.max_items:
+            self.flush(to_email)
+
+    def flush(self, to_email=None):
+        """Enviar el resumen de un aprobador (o de todos si to_email es None)"""
+        recipients = [to_email] if to_email is not None else list(self.pending)
+        flushed = 0
+        for recipient in recipients:
+            digest = self.pending.get(recipient)
+            if not digest or not digest['facturas']:
+                continue
+            # El callback persiste el resumen (bandeja de salida) antes de descartarlo aquí
+            self._flush_callback(recipient, digest['facturas'])
+            self.digests_sent += 1
+            self.invoices_sent += len(digest['facturas'])
+            flushed += len(digest['facturas'])
+            del self.pending[recipient]
+            for key in digest['claves']:
+                try:
+                    self._store.delete(key)
+                except Exception as e:
+                    print(f"❌ Error descartando factura del resumen de {recipient}: {e}")
+        return flushed
+
+    def due(self, now=None):
+        """Aprobadores cuyo resumen ya cumplió el intervalo"""
+        now = now or time.time()
+        return [to_email for to_email, digest in self.pending.items()
+                if now - digest['desde'] >= self.interval]
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for to_email in self.due():
+                try:
+                    self.flush(to_email)
+                except Exception as e:
+                    print(f"❌ Error enviando resumen a {to_email}: {e}")
+
+    def stats(self):
+        oldest = min((digest['desde'] for digest in self.pending.values()), default=None)
+        return {
+            "aprobadores_en_espera": len(self.pending),
+            "facturas_en_espera": sum(len(digest['facturas']) for digest in self.pending.values()),
+            "resumenes_enviados": self.digests_sent,
+            "facturas_enviadas": self.invoices_sent,
+            "max_facturas": self.max_items,
+            "intervalo_s": self.interval,
+            "espera_max_s": round(time.time() - oldest, 1) if oldest else 0
+        }
@@ -0,0 +1,191 @@
+# email_outbox.py
+import asyncio
+import time
+import traceback
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from json_store import JsonLogStore
+
+# Estados de un email en la bandeja de salida
+OUTBOX_PENDING = "pendiente"
+OUTBOX_DEAD = "fallido_definitivo"
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class EmailOutbox:
+    """Bandeja de salida persistente con reintentos y dead-letter.
+
+    Los emails se guardan en disco (JsonLogStore: un registro por cambio)
+    antes de intentar enviarlos, y cada uno se borra en cuanto se entrega.
+    Un worker los reintenta con backoff exponencial; tras max_attempts fallos
+    pasan a la lista de fallidos definitivos, que puede inspeccionarse y
+    reenviarse. Se conservan como mucho dead_max fallidos y dead_days días.
+    """
+
+    def __init__(self, data_file, log_file, max_attempts=5, base_delay=30, max_delay=3600,
+                 poll_interval=2, batch_size=50, dead_max=500, dead_days=30):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.dead_max = dead_max
+        self.dead_retention = timedelta(days=dead_days)
+        self._store = JsonLogStore(data_file, log_file)
+        self.entries = self._store.data
+        self._prune_dead()
+        self.sent = 0
+        self.failed_attempts = 0
+        self.send_latencies = deque(maxlen=500)   # duración de cada envío (s)
+        self.queue_latencies = deque(maxlen=500)  # de encolado a entregado (s)
+        self._sender = None
+        self._task = None
+        self._wakeup = None
+        print(f"✅ Bandeja de salida inicializada ({self.depth()} pendientes, {len(self.dead_letters())} fallidos)")
+
+    def _save(self, entry_id):
+        try:
+            self._store.put(entry_id)
+        except Exception as e:
+            print(f"❌ Error guardando email {entry_id} en la bandeja de salida: {e}")
+
+    def _remove(self, entry_id):
+        try:
+            self._store.delete(entry_id)
+        except Exception as e:
+            print(f"❌ Error quitando email {entry_id} de la bandeja de salida: {e}")
+
+    def _prune_dead(self):
+        """Descartar los fallidos definitivos más antiguos que la retención o que sobran"""
+        limit = (datetime.utcnow() - self.dead_retention).isoformat()
+        dead = sorted(self.dead_letters(), key=lambda entry: entry['fallido_en'], reverse=True)
+        for n, entry in enumerate(dead):
+            if n >= self.dead_max or entry['fallido_en'] < limit:
+                self._remove(entry['id'])
+
+    def enqueue(self, kind, payload):
+        """Guardar un email en disco para enviarlo en cuanto sea posible"""
+        now = time.time()
+        entry_id = uuid.uuid4().hex
+        self.entries[entry_id] = {
+            'id': entry_id,
+            'tipo': kind,
+            'payload': payload,
+            'status': OUTBOX_PENDING,
+            'intentos': 0,
+            'encolado_en': now,
+            'proximo_intento': now,
+            'ultimo_error': None
+        }
+        self._save(entry_id)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        print(f"📮 Email en bandeja de salida: {entry_id} ({kind})")
+        return entry_id
+
+    async def start(self, sender):
+        """Arrancar el worker; sender(entry) debe devolver True si se entregó"""
+        self._sender = sender
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            now = time.time()
+            due = [entry for entry in self.entries.values()
+                   if entry['status'] == OUTBOX_PENDING and entry['proximo_intento'] <= now]
+            due.sort(key=lambda entry: entry['proximo_intento'])
+            if due:
+                await asyncio.gather(*(self._attempt(entry) for entry in due[:self.batch_size]))
+
+    async def _attempt(self, entry):
+        start = time.time()
+        try:
+            delivered = await self._sender(entry)
+            error = None if delivered else "El servidor SMTP no aceptó el mensaje"
+        except Exception as e:
+            print(traceback.format_exc())
+            delivered, error = False, str(e)
+        finished = time.time()
+        self.send_latencies.append(finished - start)
+        entry['intentos'] += 1
+
+        if delivered:
+            # Se borra ya, no al terminar el lote: un stop() a mitad no lo reenvía
+            self.sent += 1
+            self.queue_latencies.append(finished - entry['encolado_en'])
+            self._remove(entry['id'])
+            return
+
+        self.failed_attempts += 1
+        entry['ultimo_error'] = error
+        if entry['intentos'] >= self.max_attempts:
+            entry['status'] = OUTBOX_DEAD
+            entry['fallido_en'] = datetime.utcnow().isoformat()
+            print(f"☠️  Email {entry['id']} movido a fallidos tras {entry['intentos']} intentos: {error}")
+            self._save(entry['id'])
+            self._prune_dead()
+        else:
+            delay = min(self.base_delay * 2 ** (entry['intentos'] - 1), self.max_delay)
+            entry['proximo_intento'] = finished + delay
+            print(f"🔁 Email {entry['id']} reintento {entry['intentos']}/{self.max_attempts} en {delay}s")
+            self._save(entry['id'])
+
+    def depth(self):
+        """Emails pendientes de entregar"""
+        return sum(1 for entry in self.entries.values() if entry['status'] == OUTBOX_PENDING)
+
+    def dead_letters(self):
+        return [entry for entry in self.entries.values() if entry['status'] == OUTBOX_DEAD]
+
+    def replay(self, entry_id=None):
+        """Devolver a la cola un fallido definitivo (o todos si entry_id es None)"""
+        replayed = 0
+        for entry in self.dead_letters():
+            if entry_id is None or entry['id'] == entry_id:
+                entry.update(status=OUTBOX_PENDING, intentos=0, proximo_intento=time.time())
+                entry.pop('fallido_en', None)
+                self._save(entry['id'])
+                replayed += 1
+        if replayed:
+            if self._wakeup is not None:
+                self._wakeup.set()
+        return replayed
+
+    def stats(self):
+        pending = [entry for entry in self.entries.values() if entry['status'] == OUTBOX_PENDING]
+        oldest = min((entry['encolado_en'] for entry in pending), default=None)
+        return {
+            "pendientes": len(pending),
+            "fallidos_definitivos": len(self.dead_letters()),
+            "enviados": self.sent,
+            "intentos_fallidos": self.failed_attempts,
+            "antiguedad_pendiente_max_s": round(time.time() - oldest, 1) if oldest else 0,
+            "latencia_envio_ms": {
+                "p50": round(_percentile(self.send_latencies, 0.5) * 1000, 1),
+                "p95": round(_percentile(self.send_latencies, 0.95) * 1000, 1)
+            },
+            "latencia_total_ms": {
+                "p50": round(_percentile(self.queue_latencies, 0.5) * 1000, 1),
+                "p95": round(_percentile(self.queue_latencies, 0.95) * 1000, 1)
+            }
+        }
@@ -1,21 +1,125 @@
-import smtplib
+import asyncio
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
 import config
+import os
 from datetime import datetime
+from smtp_pool import SMTPDispatcher
+from email_outbox import EmailOutbox
+from email_digest import DigestManager
+
+# Campos de la factura que usa la plantilla (no se guarda el texto OCR en la bandeja)
+EMAIL_FIELDS = ['_id', 'proveedor', 'numero_factura', 'fecha_emision', 'monto_total',
+                'impuestos', 'fecha_vencimiento', 'confianza_ocr']
+
+TEMPLATES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "email")
 
 class EmailSystem:
     def __init__(self):
         self.config = config.Config
+        # Conexiones SMTP reutilizadas desde hilos de fondo (fuera del event loop)
+        self.dispatcher = SMTPDispatcher(
+            self.config.SMTP_SERVER,
+            self.config.SMTP_PORT,
+            user=self.config.EMAIL_USER,
+            password=self.config.EMAIL_PASSWORD,
+            use_starttls=self.config.SMTP_STARTTLS,
+            use_auth=self.config.SMTP_AUTH,
+            pool_size=self.config.SMTP_POOL_SIZE,
+            batch_size=self.config.SMTP_BATCH_SIZE,
+            idle_timeout=self.config.SMTP_IDLE_TIMEOUT,
+            max_backoff=self.config.SMTP_MAX_BACKOFF
+        )
+        # Plantillas compiladas una sola vez (con caché de bytecode entre reinicios)
+        os.makedirs(self.config.EMAIL_TEMPLATE_CACHE_FOLDER, exist_ok=True)
+        self.template_env = Environment(
+            loader=FileSystemLoader(TEMPLATES_FOLDER),
+            bytecode_cache=FileSystemBytecodeCache(self.config.EMAIL_TEMPLATE_CACHE_FOLDER),
+            auto_reload=False
+        )
+        # El CSS es estático: se carga una vez y se inyecta ya renderizado
+        with open(os.path.join(TEMPLATES_FOLDER, "estilos.css"), encoding='utf-8') as f:
+            self.template_env.globals['estilos'] = f.read()
+        self.notification_template = self.template_env.get_template("notificacion.html")
+        self.digest_template = self.template_env.get_template("resumen.html")
+        
+        # Bandeja de salida persistente: reintentos con backoff y fallidos definitivos
+        self.outbox = EmailOutbox(
+            self.config.EMAIL_OUTBOX_FILE,
+            self.config.EMAIL_OUTBOX_LOG_FILE,
+            max_attempts=self.config.EMAIL_MAX_ATTEMPTS,
+            base_delay=self.config.EMAIL_RETRY_BASE_SECONDS,
+            max_delay=self.config.EMAIL_RETRY_MAX_SECONDS,
+            dead_max=self.config.EMAIL_DEAD_LETTER_MAX,
+            dead_days=self.config.EMAIL_DEAD_LETTER_DAYS
+        )
+        
+        # Resúmenes por aprobador: un solo email para muchas facturas
+        self.digest = DigestManager(
+            self.config.EMAIL_DIGEST_FILE,
+            self.config.EMAIL_DIGEST_LOG_FILE,
+            max_items=self.config.EMAIL_DIGEST_MAX_ITEMS,
+            interval=self.config.EMAIL_DIGEST_INTERVAL_MINUTES * 60
+        )
+        self.digest.set_flush_callback(self.enqueue_digest)
         print("✅ Sistema de Email Gmail inicializado")
     
+    async def start(self):
+        """Arrancar el worker de la bandeja de salida"""
+        await self.outbox.start(self._deliver)
+        if self.config.EMAIL_DIGEST_ENABLED:
+            await self.digest.start()
+    
+    def notify_approver(self, to_email, invoice_data, invoice_id):
+        """Notificar una factura: al resumen del aprobador si está activo, si no un email propio"""
+        if self.config.EMAIL_DIGEST_ENABLED:
+            self.digest.add(to_email, self._email_fields(invoice_data), invoice_id)
+            return None
+        return self.enqueue_notification(to_email, invoice_data, invoice_id)
+    
+    def _email_fields(self, invoice_data):
+        return {field: invoice_data[field] for field in EMAIL_FIELDS if field in invoice_data}
+    
+    def enqueue_notification(self, to_email, invoice_data, invoice_id):
+        """Guardar la notificación en la bandeja de salida (entrega con reintentos)"""
+        return self.outbox.enqueue("notificacion", {
+            "to_email": to_email,
+            "invoice_data": self._email_fields(invoice_data),
+            "invoice_id": invoice_id
+        })
+    
+    def notify_batch(self, to_email, items):
+        """Una sola notificación para un lote: items = [(invoice_data, invoice_id), ...]"""
+        if not items:
+            return None
+        return self.enqueue_digest(to_email, [
+            {'invoice_id': invoice_id, 'invoice_data': self._email_fields(invoice_data)}
+            for invoice_data, invoice_id in items
+        ])
+    
+    def enqueue_digest(self, to_email, facturas):
+        """Guardar un resumen en la bandeja de salida: facturas = [{'invoice_id', 'invoice_data'}, ...]"""
+        return self.outbox.enqueue("resumen", {
+            "to_email": to_email,
+            "facturas": facturas
+        })
+    
+    async def _deliver(self, entry):
+        """Enviar un email de la bandeja de salida"""
+        payload = entry['payload']
+        if entry['tipo'] == "notificacion":
+            return await self.send_notification(payload['to_email'], payload['invoice_data'], payload['invoice_id'])
+        if entry['tipo'] == "resumen":
+            return await self.send_digest(payload['to_email'], payload['facturas'])
+        raise Exception(f"Tipo de email desconocido: {entry['tipo']}")
+    
     async def send_notification(self, to_email, invoice_data, invoice_id):
         """Envía email real por Gmail"""
         try:
             print(f"\n📧 ENVIANDO EMAIL REAL A: {to_email}")
             
-            if not self.config.EMAIL_USER or not self.config.EMAIL_PASSWORD:
+            if not self.config.EMAIL_USER or (self.config.SMTP_AUTH and not self.config.EMAIL_PASSWORD):
                 print("❌ Credenciales de Gmail no configuradas")
                 return False
             
@@ -34,15 +138,12 @@ class EmailSystem:
             html_content = self.create_email_template(invoice_data, approval_url, rejection_url)
             msg.attach(MIMEText(html_content, 'html'))
             
-            # ENVÍO CON GMAIL
-            print("🔄 Conectando a Gmail...")
-            server = smtplib.SMTP(self.config.SMTP_SERVER, self.config.SMTP_PORT)
-            server.starttls()
-            print("🔐 Autenticando...")
-            server.login(self.config.EMAIL_USER, self.config.EMAIL_PASSWORD)
+            # ENVÍO CON GMAIL (pool de conexiones en segundo plano)
             print("📤 Enviando email...")
-            server.send_message(msg)
-            server.quit()
+            sent = await asyncio.wrap_future(self.dispatcher.submit(msg))
+            if not sent:
+                print("❌ El email no pudo entregarse")
+                return False
             
             print("🎉 EMAIL GMAIL ENVIADO EXITOSAMENTE!")
             print(f"   Para: {to_email}")
@@ -53,166 +154,36 @@ class EmailSystem:
             print(f"❌ Error enviando email: {e}")
             return False
     
-    def create_email_template(self, invoice_data, approval_url, rejection_url):
-        """Crea plantilla HTML profesional"""
-        html_template = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1">
-            <style>
-                body { 
-                    font-family: 'Arial', sans-serif; 
-                    margin: 0; padding: 0; 
-                    background: #f5f5f5;
-                }
-                .container { 
-                    max-width: 600px; 
-                    margin: 20px auto; 
-                    background: white; 
-                    border-radius: 10px; 
-                    overflow: hidden; 
-                    box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-                }
-                .header { 
-                    background: #4285f4; 
-                    color: white; 
-                    padding: 30px; 
-                    text-align: center; 
-                }
-                .header h1 { 
-                    margin: 0; 
-                    font-size: 24px;
-                }
-                .content { 
-                    padding: 30px; 
-                }
-                .invoice-info { 
-                    background: #f8f9fa; 
-                    padding: 20px; 
-                    border-radius: 8px; 
-                    margin: 20px 0; 
-                    border-left: 4px solid #4285f4;
-                }
-                table { 
-                    width: 100%; 
-                    border-collapse: collapse; 
-                }
-                th, td { 
-                    padding: 12px; 
-                    text-align: left; 
-                    border-bottom: 1px solid #e0e0e0; 
-                }
-                th { 
-                    background: #f1f3f4; 
-                    font-weight: 600;
-                    color: #333;
-                }
-                .actions { 
-                    text-align: center; 
-                    margin: 30px 0; 
-                }
-                .btn { 
-                    display: inline-block; 
-                    padding: 15px 30px; 
-                    margin: 0 10px; 
-                    text-decoration: none; 
-                    border-radius: 8px; 
-                    font-weight: bold; 
-                    color: white;
-                    font-size: 16px;
-                }
-                .btn-approve { 
-                    background: #34a853; 
-                }
-                .btn-reject { 
-                    background: #ea4335; 
-                }
-                .footer { 
-                    text-align: center; 
-                    padding: 20px; 
-                    background: #f8f9fa; 
-                    color: #666; 
-                    font-size: 14px;
-                }
-                .btn:hover {
-                    opacity: 0.9;
-                }
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>📋 Factura para Revisión</h1>
-                    <p>Sistema de Procesamiento de Facturas con IA</p>
-                </div>
-                
-                <div class="content">
-                    <div class="invoice-info">
-                        <table>
-                            <tr>
-                                <th>Proveedor:</th>
-                                <td>{{ proveedor }}</td>
-                            </tr>
-                            <tr>
-                                <th>N° Factura:</th>
-                                <td>{{ numero_factura }}</td>
-                            </tr>
-                            <tr>
-                                <th>Fecha de Emisión:</th>
-                                <td>{{ fecha_emision }}</td>
-                            </tr>
-                            <tr>
-                                <th>Monto Total:</th>
-                                <td style="color: #34a853; font-weight: bold;">${{ monto_total }}</td>
-                            </tr>
-                            <tr>
-                                <th>Impuestos:</th>
-                                <td>${{ impuestos }}</td>
-                            </tr>
-                            <tr>
-                                <th>Fecha de Vencimiento:</th>
-                                <td>{{ fecha_vencimiento }}</td>
-                            </tr>
-                            <tr>
-                                <th>Confianza de Extracción:</th>
-                                <td>{{ confianza_ocr }}%</td>
-                            </tr>
-                        </table>
-                    </div>
-
-                    <div class="actions">
-                        <p style="margin-bottom: 20px; color: #333; font-size: 18px;">
-                            <strong>¿Qué acción desea tomar?</strong>
-                        </p>
-                        <a href="{{ approval_url }}" class="btn btn-approve">
-                            ✅ Aprobar Factura
-                        </a>
-                        <a href="{{ rejection_url }}" class="btn btn-reject">
-                            ❌ Rechazar Factura
-                        </a>
-                    </div>
-
-                    <div style="background: #e8f0fe; padding: 15px; border-radius: 8px; margin-top: 20px;">
-                        <p style="margin: 0; color: #1967d2; font-size: 14px;">
-                            <strong>ID de Transacción:</strong> {{ invoice_id }}<br>
-                            <strong>Procesado el:</strong> {{ fecha_procesamiento }}
-                        </p>
-                    </div>
-                </div>
-                
-                <div class="footer">
-                    <p>🤖 Sistema Inteligente de Procesamiento de Facturas</p>
-                    <p>Este es un mensaje automático, por favor no responda a este correo.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        template = Template(html_template)
-        return template.render(
+    async def send_digest(self, to_email, facturas):
+        """Envía un único email con todas las facturas pendientes del aprobador"""
+        try:
+            print(f"\n📧 ENVIANDO RESUMEN ({len(facturas)} facturas) A: {to_email}")
+            
+            if not self.config.EMAIL_USER or (self.config.SMTP_AUTH and not self.config.EMAIL_PASSWORD):
+                print("❌ Credenciales de Gmail no configuradas")
+                return False
+            
+            msg = MIMEMultipart()
+            msg['Subject'] = f"📋 Revisión Requerida - {len(facturas)} facturas pendientes"
+            msg['From'] = self.config.EMAIL_USER
+            msg['To'] = to_email
+            msg.attach(MIMEText(self.create_digest_template(facturas), 'html'))
+            
+            sent = await asyncio.wrap_future(self.dispatcher.submit(msg))
+            if not sent:
+                print("❌ El resumen no pudo entregarse")
+                return False
+            
+            print(f"🎉 RESUMEN ENVIADO A {to_email} ({len(facturas)} facturas)")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error enviando resumen: {e}")
+            return False
+    
+    def _template_context(self, invoice_data, approval_url, rejection_url):
+        """Variables de la plantilla de notificación"""
+        return dict(
             proveedor=invoice_data.get('proveedor', 'No identificado'),
             numero_factura=invoice_data.get('numero_factura', 'N/A'),
             fecha_emision=invoice_data.get('fecha_emision', 'N/A'),
@@ -225,6 +196,49 @@ class EmailSystem:
             approval_url=approval_url,
             rejection_url=rejection_url
         )
+    
+    def create_email_template(self, invoice_data, approval_url, rejection_url):
+        """Crea plantilla HTML profesional (plantilla precompilada)"""
+        return self.notification_template.render(
+            **self._template_context(invoice_data, approval_url, rejection_url)
+        )
+    
+    def create_digest_template(self, facturas):
+        """HTML del resumen con enlaces de aprobar/rechazar por factura"""
+        base_url = self.config.BASE_URL
+        items = [
+            self._template_context(
+                item['invoice_data'],
+                f"{base_url}/api/approve/{item['invoice_id']}",
+                f"{base_url}/reject-form/{item['invoice_id']}"
+            )
+            for item in facturas
+        ]
+        return self.digest_template.render(
+            facturas=items,
+            total=len(items),
+            fecha_procesamiento=datetime.now().strftime("%d/%m/%Y %H:%M"),
+            base_url=base_url
+        )
+    
+    def render_notifications(self, items):
+        """Renderiza muchas notificaciones en una pasada: items = [(invoice_data, invoice_id), ...]"""
+        base_url = self.config.BASE_URL
+        render = self.notification_template.render
+        return [
+            render(**self._template_context(
+                invoice_data,
+                f"{base_url}/api/approve/{invoice_id}",
+                f"{base_url}/reject-form/{invoice_id}"
+            ))
+            for invoice_data, invoice_id in items
+        ]
+    
+    async def shutdown(self):
+        """Detener la bandeja de salida y cerrar las conexiones SMTP"""
+        await self.digest.stop()
+        await self.outbox.stop()
+        self.dispatcher.stop()
 
 # Instancia global
 email_system = EmailSystem()
\ No newline at end of file
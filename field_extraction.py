@@ -0,0 +1,118 @@
+# field_extraction.py
+import bisect
+import re
+
+# Palabra clave que debe aparecer en la línea para buscar cada campo (en orden de prioridad)
+FIELD_KEYWORDS = [
+    ('numero_factura', 'factura'),
+    ('proveedor', 'proveedor'),
+    ('monto_total', 'total'),
+    ('impuestos', 'iva'),
+    ('fecha_emision', 'fecha'),
+    ('fecha_vencimiento', 'vencimiento')
+]
+FIELD_ORDER = {field: n for n, (field, _) in enumerate(FIELD_KEYWORDS)}
+
+FIELDS_BY_KEYWORD = {}
+for _field, _keyword in FIELD_KEYWORDS:
+    FIELDS_BY_KEYWORD.setdefault(_keyword, []).append(_field)
+
+# Una sola pasada sobre el texto en minúsculas con todas las palabras clave
+KEYWORD_SCAN = re.compile('|'.join(sorted(FIELDS_BY_KEYWORD)))
+# finditer no devuelve coincidencias solapadas: palabras clave que pueden empezar
+# dentro de otra ("vencimientotal" contiene "vencimiento" y "total")
+KEYWORD_OVERLAPS = {
+    keyword: [(offset, other) for other in FIELDS_BY_KEYWORD for offset in range(1, len(keyword))
+              if other.startswith(keyword[offset:]) or keyword.startswith(other, offset)]
+    for keyword in FIELDS_BY_KEYWORD
+}
+
+NEWLINE = re.compile('\n')
+NUMBER_PATTERN = re.compile(r'(?:factura|invoice)[\s:]*([^\n\r]+)', re.IGNORECASE)
+SUPPLIER_PATTERN = re.compile(r'(?:proveedor|vendor)[\s:]*([^\n\r]+)', re.IGNORECASE)
+AMOUNT_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'[\$]?\s*(\d{1,3}(?:,\d{3})*\.\d{2})',  # $1,250.00
+    r'[\$]?\s*(\d{1,3}(?:\.\d{3})*,\d{2})',  # $1.250,00
+    r'[\$]?\s*(\d+\.\d{2})',                 # $1250.00
+    r'[\$]?\s*(\d+,\d{2})',                  # $1250,00
+    r'total[\s:]*[\$]?\s*([0-9,\.]+)'        # total: $1,250.00
+)]
+TAX_PATTERN = re.compile(r'[\$]?\s*(\d+[.,]\d{2})')
+DATE_PATTERN = re.compile(r'(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})')
+
+
+def _search_group(pattern, text, strip=False):
+    match = pattern.search(text)
+    if not match:
+        return None
+    return match.group(1).strip() if strip else match.group(1)
+
+
+def _extract_amount(line, line_clean):
+    # El orden de la tabla es la prioridad: el primer formato que aparece gana
+    for pattern in AMOUNT_PATTERNS:
+        match = pattern.search(line_clean)
+        if match:
+            return match.group(1)
+    return None
+
+
+# Extractor de cada campo sobre (línea original, línea sin espacios en los extremos)
+FIELD_EXTRACTORS = {
+    'numero_factura': lambda line, line_clean: _search_group(NUMBER_PATTERN, line, strip=True),
+    'proveedor': lambda line, line_clean: _search_group(SUPPLIER_PATTERN, line, strip=True),
+    'monto_total': _extract_amount,
+    'impuestos': lambda line, line_clean: _search_group(TAX_PATTERN, line_clean),
+    'fecha_emision': lambda line, line_clean: _search_group(DATE_PATTERN, line_clean),
+    'fecha_vencimiento': lambda line, line_clean: _search_group(DATE_PATTERN, line_clean)
+}
+
+
+def candidate_lines(text):
+    """Líneas donde aparece la palabra clave de cada campo: (líneas, {campo: [índices]})"""
+    lines = text.split('\n')
+    # Posiciones sobre el texto en minúsculas: lower() puede cambiar longitudes ("İ" -> "i̇")
+    lowered = text.lower()
+    newlines = [match.start() for match in NEWLINE.finditer(lowered)]
+    candidates = {field: [] for field, _ in FIELD_KEYWORDS}
+    for match in KEYWORD_SCAN.finditer(lowered):
+        start = match.start()
+        keyword = match.group()
+        line_index = bisect.bisect_left(newlines, start)
+        keywords = [keyword] + [other for offset, other in KEYWORD_OVERLAPS[keyword]
+                                if lowered.startswith(other, start + offset)]
+        for keyword in keywords:
+            for field in FIELDS_BY_KEYWORD[keyword]:
+                indexes = candidates[field]
+                if not indexes or indexes[-1] != line_index:
+                    indexes.append(line_index)
+    return lines, candidates
+
+
+def extract_fields(text):
+    """Campos crudos de la factura (sin "No encontrado" ni conversión de montos).
+
+    Equivale al recorrido línea a línea original: para cada campo se toma la
+    primera línea con su palabra clave cuyo patrón da un valor no vacío, pero
+    sólo se evalúan las líneas candidatas encontradas en una única pasada.
+    """
+    lines, candidates = candidate_lines(text)
+    found = []  # (línea de la primera asignación, prioridad, campo, valor)
+    for field, indexes in candidates.items():
+        extractor = FIELD_EXTRACTORS[field]
+        first_line = None
+        value = None
+        for line_index in indexes:
+            line = lines[line_index]
+            result = extractor(line, line.strip())
+            if result is None:
+                continue
+            if first_line is None:
+                first_line = line_index
+            value = result
+            if value:
+                break
+        if first_line is not None:
+            found.append((first_line, FIELD_ORDER[field], field, value))
+    # Mismo orden de claves que el parser por líneas
+    return {field: value for _, _, field, value in sorted(found)}
@@ -0,0 +1,203 @@
+# file_intake.py
+import hashlib
+import json
+import os
+import uuid
+import zipfile
+import aiofiles
+from starlette.exceptions import HTTPException
+
+# Firmas (magic bytes) de los formatos aceptados -> extensión con la que se guarda
+FILE_SIGNATURES = [
+    (b'%PDF-', 'pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+    (b'BM', 'bmp'),
+    (b'PK\x03\x04', 'zip')
+]
+
+
+class UploadTooLargeError(Exception):
+    """El archivo supera el tamaño máximo permitido"""
+
+
+class _ZipTotalExceeded(Exception):
+    """Uso interno de extract_zip: el total descomprimido pasó del máximo"""
+
+
+class UnsupportedFileTypeError(Exception):
+    """El contenido del archivo no corresponde a un formato soportado"""
+
+
+def sniff_file_type(head):
+    """Detectar el formato real a partir de los primeros bytes (None si no se reconoce)"""
+    for signature, file_type in FILE_SIGNATURES:
+        if head.startswith(signature):
+            return file_type
+    # Algunos generadores de PDF anteponen basura antes de la cabecera
+    if b'%PDF-' in head[:1024]:
+        return 'pdf'
+    return None
+
+
+class UploadSizeLimitMiddleware:
+    """Límite de tamaño del cuerpo de las subidas aplicado al flujo ASGI.
+
+    Starlette recibe el multipart completo (en archivos temporales) antes de
+    llamar al endpoint, así que los límites de save_upload_stream llegan
+    tarde. Aquí se rechaza por Content-Length antes de leer el cuerpo y, si
+    no viene (transfer-encoding chunked) o es falso, contando los bytes a
+    medida que llegan: al superar el límite se corta la lectura con un 413.
+    limit_for(path) devuelve el máximo en bytes o None si la ruta no se limita.
+    """
+
+    def __init__(self, app, limit_for):
+        self.app = app
+        self.limit_for = limit_for
+
+    async def __call__(self, scope, receive, send):
+        max_bytes = None
+        if scope['type'] == 'http' and scope['method'] == 'POST':
+            max_bytes = self.limit_for(scope['path'])
+        if max_bytes is None:
+            return await self.app(scope, receive, send)
+
+        detail = f"La subida supera el máximo de {max_bytes // (1024 * 1024)} MB"
+        content_length = dict(scope['headers']).get(b'content-length', b'')
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            body = json.dumps({"detail": detail}, ensure_ascii=False).encode('utf-8')
+            await send({'type': 'http.response.start', 'status': 413,
+                        'headers': [(b'content-type', b'application/json'),
+                                    (b'content-length', str(len(body)).encode('ascii'))]})
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message['type'] == 'http.request':
+                received += len(message.get('body', b''))
+                if received > max_bytes:
+                    # FastAPI deja pasar HTTPException al leer el formulario: llega como 413
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+async def save_upload_stream(upload, folder, max_bytes, allowed_types, chunk_size=1024 * 1024):
+    """Copiar un UploadFile a disco por bloques.
+
+    Cuando se llama, Starlette ya recibió el cuerpo entero: el tamaño de la
+    petición se limita antes, en UploadSizeLimitMiddleware. Aquí el tipo se
+    valida con el primer bloque y el tamaño de cada archivo en cada bloque,
+    sin copiar a la carpeta definitiva un archivo inválido. El SHA-256 se
+    calcula sobre la marcha. Devuelve {file_path, size, content_hash, file_type}.
+    """
+    first = await upload.read(chunk_size)
+    file_type = sniff_file_type(first)
+    if file_type is None or file_type not in allowed_types:
+        raise UnsupportedFileTypeError(
+            f"Contenido no reconocido como {', '.join(sorted(allowed_types))}"
+        )
+
+    file_path = os.path.join(folder, f"{uuid.uuid4()}.{file_type}")
+    digest = hashlib.sha256()
+    size = 0
+    chunk = first
+    try:
+        async with aiofiles.open(file_path, 'wb') as f:
+            while chunk:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"El archivo supera el máximo de {max_bytes // (1024 * 1024)} MB")
+                digest.update(chunk)
+                await f.write(chunk)
+                chunk = await upload.read(chunk_size)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+    return {
+        "file_path": file_path,
+        "size": size,
+        "content_hash": digest.hexdigest(),
+        "file_type": file_type
+    }
+
+
+def extract_zip(zip_path, folder, max_bytes, allowed_types, max_files, max_total_bytes,
+                chunk_size=1024 * 1024):
+    """Extraer a disco los archivos de un ZIP con las mismas validaciones que una subida.
+
+    Cada miembro se copia por bloques (tipo por magic bytes, límite de tamaño
+    y SHA-256 sobre la marcha). Los bytes escritos se suman entre todos los
+    miembros: en cuanto el total pasa de max_total_bytes se para, se borra lo
+    extraído y se lanza UploadTooLargeError, así un ZIP bomba no llena el
+    disco. Devuelve una lista de {archivo, ...resultado de la copia} o
+    {archivo, error}.
+    """
+    results = []
+    total = 0
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not os.path.basename(info.filename).startswith('.')
+            and not info.filename.startswith('__MACOSX/')
+        ]
+        if len(members) > max_files:
+            raise UploadTooLargeError(f"El ZIP contiene {len(members)} archivos (máximo {max_files})")
+
+        for info in members:
+            name = os.path.basename(info.filename)
+            try:
+                with archive.open(info) as member:
+                    first = member.read(chunk_size)
+                    file_type = sniff_file_type(first)
+                    if file_type is None or file_type not in allowed_types:
+                        raise UnsupportedFileTypeError("Contenido no reconocido como factura")
+
+                    file_path = os.path.join(folder, f"{uuid.uuid4()}.{file_type}")
+                    digest = hashlib.sha256()
+                    size = 0
+                    chunk = first
+                    try:
+                        with open(file_path, 'wb') as f:
+                            while chunk:
+                                size += len(chunk)
+                                total += len(chunk)
+                                if total > max_total_bytes:
+                                    raise _ZipTotalExceeded()
+                                if size > max_bytes:
+                                    raise UploadTooLargeError(f"Supera el máximo de {max_bytes // (1024 * 1024)} MB")
+                                digest.update(chunk)
+                                f.write(chunk)
+                                chunk = member.read(chunk_size)
+                    except Exception:
+                        if os.path.exists(file_path):
+                            os.remove(file_path)
+                        raise
+            except _ZipTotalExceeded:
+                for item in results:
+                    if 'file_path' in item and os.path.exists(item['file_path']):
+                        os.remove(item['file_path'])
+                raise UploadTooLargeError(
+                    f"El contenido del ZIP supera el máximo de {max_total_bytes // (1024 * 1024)} MB"
+                )
+            except Exception as e:
+                results.append({"archivo": name, "error": str(e)})
+                continue
+
+            results.append({
+                "archivo": name,
+                "file_path": file_path,
+                "size": size,
+                "content_hash": digest.hexdigest(),
+                "file_type": file_type
+            })
+    return results
@@ -0,0 +1,260 @@
+# hot_folder.py
+import asyncio
+import os
+import shutil
+import time
+import traceback
+from datetime import datetime
+import config
+from json_store import load_json, save_json_atomic
+from ocr_cache import hash_file
+from ingestion import ingest_file
+from database import db
+from email_system import email_system
+from invoice_processor import processor
+
+# Estados de un contenido en la carpeta vigilada
+HOT_PROCESSING = "procesando"
+HOT_DONE = "completado"
+HOT_FAILED = "fallido"
+
+# Archivos que los escáneres o el sistema dejan mientras copian
+TEMP_SUFFIXES = ('.tmp', '.part', '.crdownload', '.filepart')
+
+
+class HotFolderWatcher:
+    """Ingesta automática de los archivos que aparecen en una carpeta.
+
+    La carpeta se revisa cada poll_interval segundos. Un archivo se procesa
+    cuando su tamaño y mtime no cambian durante stable_seconds (el escáner
+    terminó de escribirlo). El estado se guarda por hash de contenido, así un
+    reinicio o un archivo repetido no generan facturas duplicadas; si el
+    proceso cae entre guardar la factura y marcar el estado, ingest_hot_file
+    la encuentra en la BD por su hash_contenido. Al terminar, el original se
+    mueve a la carpeta de procesados o de fallidos.
+    """
+
+    def __init__(self, folder, done_folder, failed_folder, state_file, allowed_extensions,
+                 poll_interval=5, stable_seconds=10, max_workers=2):
+        self.folder = folder
+        self.done_folder = done_folder
+        self.failed_folder = failed_folder
+        self.state_file = state_file
+        self.allowed_extensions = allowed_extensions
+        self.poll_interval = poll_interval
+        self.stable_seconds = stable_seconds
+        self.max_workers = max(1, max_workers)
+        self.state = load_json(self.state_file, {})  # hash -> {archivo, status, invoice_id, ...}
+        self._seen = {}         # ruta -> (tamaño, mtime, desde cuándo no cambia)
+        self._inflight = set()  # rutas en cola o procesándose
+        self._active_hashes = set()  # contenidos procesándose ahora mismo
+        self._queue = None
+        self._tasks = []
+        self._handler = None
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+
+    def _save(self):
+        try:
+            save_json_atomic(self.state_file, self.state)
+        except Exception as e:
+            print(f"❌ Error guardando estado de la carpeta vigilada: {e}")
+
+    def _set_state(self, content_hash, **fields):
+        entry = self.state.setdefault(content_hash, {})
+        entry.update(fields)
+        entry['updated_at'] = datetime.utcnow().isoformat()
+        self._save()
+
+    async def start(self, handler):
+        """Arrancar el sondeo y los workers; handler(file_path, content_hash) devuelve el invoice_id"""
+        for path in (self.folder, self.done_folder, self.failed_folder):
+            os.makedirs(path, exist_ok=True)
+        self._handler = handler
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+        self._tasks.append(asyncio.create_task(self._poll_loop()))
+        print(f"📂 Carpeta vigilada: {os.path.abspath(self.folder)} ({self.max_workers} workers)")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _candidates(self):
+        """Archivos de primer nivel con extensión admitida"""
+        for entry in os.scandir(self.folder):
+            if not entry.is_file() or entry.name.startswith(('.', '~$')):
+                continue
+            name = entry.name.lower()
+            if name.endswith(TEMP_SUFFIXES) or name.rsplit('.', 1)[-1] not in self.allowed_extensions:
+                continue
+            yield entry
+
+    def scan(self, now=None):
+        """Devuelve las rutas que ya están estables y no se están procesando"""
+        now = now or time.time()
+        stable = []
+        current = set()
+        for entry in self._candidates():
+            path = entry.path
+            current.add(path)
+            if path in self._inflight:
+                continue
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime)
+            previous = self._seen.get(path)
+            if previous is None or previous[:2] != signature:
+                self._seen[path] = (*signature, now)
+                continue
+            if now - previous[2] >= self.stable_seconds and now - stat.st_mtime >= self.stable_seconds:
+                stable.append(path)
+        # Olvidar los archivos que ya no están
+        for path in list(self._seen):
+            if path not in current:
+                del self._seen[path]
+        return stable
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                for path in self.scan():
+                    self._inflight.add(path)
+                    await self._queue.put(path)
+            except Exception as e:
+                print(f"❌ Error revisando carpeta vigilada: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _worker(self):
+        while True:
+            path = await self._queue.get()
+            try:
+                await self._ingest(path)
+            except Exception:
+                print(traceback.format_exc())
+            finally:
+                self._inflight.discard(path)
+                self._seen.pop(path, None)
+                self._queue.task_done()
+
+    async def _ingest(self, path):
+        name = os.path.basename(path)
+        content_hash = await asyncio.to_thread(hash_file, path)
+        known = self.state.get(content_hash)
+
+        if known and known['status'] == HOT_DONE:
+            # Ya ingerido (antes de un reinicio o el mismo escaneo repetido)
+            print(f"♻️  {name} ya procesado como factura {known.get('invoice_id')}, se archiva")
+            self.duplicates += 1
+            self._move(path, self.done_folder)
+            return
+
+        if content_hash in self._active_hashes:
+            # Otra copia del mismo contenido está en curso: se revisará en el próximo sondeo
+            return
+
+        print(f"📄 Carpeta vigilada: procesando {name}")
+        self._active_hashes.add(content_hash)
+        self._set_state(content_hash, archivo=name, status=HOT_PROCESSING)
+        try:
+            invoice_id = await self._handler(path, content_hash)
+        except Exception as e:
+            print(f"❌ Carpeta vigilada: {name} falló: {e}")
+            self.failed += 1
+            self._set_state(content_hash, status=HOT_FAILED, error=str(e))
+            self._move(path, self.failed_folder)
+            return
+        finally:
+            self._active_hashes.discard(content_hash)
+
+        self.processed += 1
+        self._set_state(content_hash, status=HOT_DONE, invoice_id=str(invoice_id), error=None)
+        self._move(path, self.done_folder)
+        print(f"✅ Carpeta vigilada: {name} -> factura {invoice_id}")
+
+    def _move(self, path, folder):
+        target = os.path.join(folder, os.path.basename(path))
+        if os.path.exists(target):
+            base, ext = os.path.splitext(os.path.basename(path))
+            target = os.path.join(folder, f"{base}_{int(time.time() * 1000)}{ext}")
+        try:
+            shutil.move(path, target)
+        except Exception as e:
+            print(f"⚠️  No se pudo mover {path} a {folder}: {e}")
+
+    def stats(self):
+        statuses = [entry['status'] for entry in self.state.values()]
+        return {
+            "carpeta": self.folder,
+            "activa": bool(self._tasks),
+            "en_cola": len(self._inflight),
+            "procesados": self.processed,
+            "fallidos": self.failed,
+            "duplicados": self.duplicates,
+            "historico": {
+                "completados": statuses.count(HOT_DONE),
+                "fallidos": statuses.count(HOT_FAILED)
+            }
+        }
+
+
+def create_hot_folder():
+    """Carpeta vigilada según la configuración"""
+    cfg = config.Config
+    return HotFolderWatcher(
+        cfg.HOT_FOLDER_PATH,
+        cfg.HOT_FOLDER_DONE or os.path.join(cfg.HOT_FOLDER_PATH, "procesados"),
+        cfg.HOT_FOLDER_FAILED or os.path.join(cfg.HOT_FOLDER_PATH, "fallidos"),
+        cfg.HOT_FOLDER_STATE_FILE,
+        cfg.ALLOWED_EXTENSIONS,
+        poll_interval=cfg.HOT_FOLDER_POLL_SECONDS,
+        stable_seconds=cfg.HOT_FOLDER_STABLE_SECONDS,
+        max_workers=cfg.HOT_FOLDER_WORKERS
+    )
+
+
+# Instancia global
+hot_folder = create_hot_folder()
+
+
+async def ingest_hot_file(file_path, content_hash):
+    """OCR + guardado en BD + notificación al aprobador de la carpeta vigilada"""
+    # La factura pudo guardarse en una ejecución que cayó antes de marcar el archivo
+    # Búsqueda indexada en el propio bucle, como el resto de accesos a la BD
+    invoice_id = db.find_invoice_by_hash(content_hash)
+    if invoice_id:
+        print(f"♻️  {os.path.basename(file_path)} ya estaba guardado como factura {invoice_id}")
+        return invoice_id
+    invoice_id, invoice_data = await ingest_file(file_path, content_hash)
+    email_system.notify_approver(config.Config.HOT_FOLDER_APPROVER_EMAIL, invoice_data, str(invoice_id))
+    return invoice_id
+
+
+async def main():
+    """Ejecutar solo la carpeta vigilada, sin el servidor web.
+
+    Sólo con DB_BACKEND=sqlite: los backends json/log guardan las facturas y
+    las estadísticas en la memoria de cada proceso, y la API no vería las
+    facturas que se guardan desde aquí (o las pisaría al escribir el archivo).
+    """
+    if config.Config.DB_BACKEND != "sqlite":
+        print(f"❌ La carpeta vigilada sin servidor requiere DB_BACKEND=sqlite (actual: {config.Config.DB_BACKEND}).")
+        print("   Con otro backend, actívela dentro de la API (HOT_FOLDER_ENABLED).")
+        raise SystemExit(1)
+    await email_system.start()
+    await hot_folder.start(ingest_hot_file)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await hot_folder.stop()
+        processor.executor.shutdown()
+        await email_system.shutdown()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("👋 Carpeta vigilada detenida")
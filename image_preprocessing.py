@@ -0,0 +1,195 @@
+# image_preprocessing.py
+import math
+from PIL import Image
+
+try:
+    import cv2
+    import numpy as np
+    OPENCV_AVAILABLE = True
+except ImportError:  # Sin OpenCV se usa la cadena PIL de InvoiceProcessor
+    cv2 = None
+    np = None
+    OPENCV_AVAILABLE = False
+
+# Valores por defecto de los umbrales que deciden cada paso
+DEFAULT_PARAMS = {
+    'ancho_minimo': 800,
+    'ancho_reescalado': 1200,
+    'rango_minimo': 120,         # diferencia papel-tinta por debajo de la cual se estira
+    'ruido_maximo': 6.0,         # sigma estimada a partir de la cual se aplica la mediana
+    'mediana': 3,
+    'inclinacion_minima': 0.3,   # grados; por debajo no compensa rotar
+    'inclinacion_maxima': 10.0,  # grados; más allá suele ser un error de estimación
+    'iluminacion_maxima': 40,    # diferencia de fondo entre zonas que pide umbral adaptativo
+    'bloque_adaptativo': 31
+}
+
+# Núcleo de Immerkær para estimar el ruido gaussiano
+_NOISE_KERNEL = [[1, -2, 1], [-2, 4, -2], [1, -2, 1]]
+NOISE_EDGE_FRACTION = 0.1    # píxeles de mayor gradiente que no cuentan para el ruido
+BACKGROUND_PERCENTILE = 90   # en cada zona, el papel es de lo más claro aunque haya tinta
+
+
+def to_gray_array(image):
+    """Imagen PIL a un único buffer uint8 en escala de grises (una sola copia)"""
+    if image.mode == 'L':
+        return np.array(image)
+    if image.mode in ('RGBA', 'LA', 'P') or image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    return cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2GRAY)
+
+
+def measure(gray, params):
+    """Estadísticas de la página sobre una muestra 1 de cada 4 píxeles"""
+    sample = gray[::4, ::4]
+    mean = float(sample.mean())
+    # Papel = mediana; tinta = percentil 5 de los píxeles claramente más oscuros que el papel
+    # (la tinta ocupa poca superficie, la desviación típica o el percentil 1 no la ven)
+    histogram = cv2.calcHist([sample], [0], None, [256], [0, 256]).ravel()
+    cumulative = np.cumsum(histogram)
+    paper = int(np.searchsorted(cumulative, cumulative[-1] / 2))
+    ink = paper
+    dark = cumulative[max(0, paper - 30)]
+    if dark >= 50:
+        ink = int(np.searchsorted(cumulative, dark * 0.05))
+
+    return {
+        'media': round(mean, 1),
+        'tinta': ink,
+        'papel': paper,
+        'rango': paper - ink,
+        'ruido': round(estimate_noise(sample), 2),
+        'iluminacion': estimate_illumination(sample),
+        'inclinacion': estimate_skew(sample, params)
+    }
+
+
+def estimate_noise(sample):
+    """Sigma del ruido (Immerkær) fuera de los bordes.
+
+    Los bordes de la tinta dan una respuesta enorme al núcleo y en una página
+    limpia pasarían por ruido: se descarta el NOISE_EDGE_FRACTION de píxeles
+    con mayor gradiente (Sobel), más su vecindad 3x3, que es lo que alcanza
+    el núcleo.
+    """
+    data = sample.astype(np.float32)
+    laplacian = cv2.filter2D(data, -1, np.array(_NOISE_KERNEL, dtype=np.float32))
+    gradient = cv2.magnitude(cv2.Sobel(data, cv2.CV_32F, 1, 0), cv2.Sobel(data, cv2.CV_32F, 0, 1))
+    edges = (gradient > np.percentile(gradient, 100 * (1 - NOISE_EDGE_FRACTION))).astype(np.uint8)
+    flat = cv2.dilate(edges, np.ones((3, 3), np.uint8)) == 0
+    if flat.sum() < sample.size * NOISE_EDGE_FRACTION:
+        # Casi todo es borde (ruido muy fuerte): mejor la estimación sin máscara
+        flat = np.ones(sample.shape, dtype=bool)
+    return float(np.abs(laplacian[flat]).mean()) * math.sqrt(math.pi / 2) / 6
+
+
+def estimate_illumination(sample, grid=4):
+    """Diferencia entre el fondo más claro y el más oscuro de una rejilla grid x grid.
+
+    El fondo de cada zona es su percentil BACKGROUND_PERCENTILE: con la media
+    (o un reescalado INTER_AREA) una zona con mucha tinta, como una cabecera
+    oscura o una tabla densa, parecería una sombra.
+    """
+    height, width = sample.shape
+    # En imágenes diminutas la rejilla no puede tener más celdas que píxeles
+    grid = min(grid, height, width)
+    if grid == 0:
+        return 0
+    backgrounds = [
+        np.percentile(sample[row * height // grid:(row + 1) * height // grid,
+                             col * width // grid:(col + 1) * width // grid], BACKGROUND_PERCENTILE)
+        for row in range(grid) for col in range(grid)
+    ]
+    return int(max(backgrounds)) - int(min(backgrounds))
+
+
+def estimate_skew(sample, params):
+    """Inclinación del texto en grados a partir del rectángulo mínimo de la tinta"""
+    _, ink = cv2.threshold(sample, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    points = cv2.findNonZero(ink)
+    if points is None or len(points) < 50:
+        return 0.0
+    angle = cv2.minAreaRect(points)[2]
+    # Según la versión de OpenCV el ángulo viene en [-90, 0) o (0, 90]; se lleva a [-45, 45)
+    angle = (angle + 45) % 90 - 45
+    if abs(angle) > params['inclinacion_maxima']:
+        return 0.0
+    return round(float(angle), 2)
+
+
+def estimate_text_height(gray, strips=4, min_height=3):
+    """Altura típica (mediana) de las líneas de texto en píxeles, o None si no hay texto.
+
+    Perfil de proyección horizontal por franjas verticales: en cada franja las
+    filas con tinta consecutivas forman una línea. Las franjas evitan que dos
+    columnas con líneas desalineadas se fundan en una sola más alta; las
+    filas aisladas (reglas de tablas, ruido) se descartan con min_height.
+    """
+    if gray.size == 0:
+        return None
+    threshold = min(200, int(cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[0]))
+    ink = gray < threshold
+    height, width = ink.shape
+    heights = []
+    step = max(1, width // strips)
+    for left in range(0, width - step + 1, step):
+        rows = ink[:, left:left + step].any(axis=1)
+        # Bordes de las rachas de filas con tinta
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], rows, [False])).astype(np.int8)))
+        runs = edges[1::2] - edges[::2]
+        heights.extend(int(run) for run in runs if run >= min_height)
+    if not heights:
+        return None
+    return float(np.median(heights))
+
+
+def preprocess(image, params=None):
+    """Preprocesamiento vectorizado con OpenCV.
+
+    Trabaja sobre un solo buffer en escala de grises y aplica cada paso sólo
+    si las estadísticas medidas lo piden: reescalado de páginas pequeñas,
+    mediana con ruido alto, estirado del histograma con poco contraste,
+    enderezado con inclinación apreciable y binarización (Otsu o adaptativa
+    si la iluminación es desigual). Devuelve (imagen PIL, pasos aplicados,
+    estadísticas).
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    gray = to_gray_array(image)
+    stats = measure(gray, params)
+    steps = []
+
+    height, width = gray.shape
+    if width < params['ancho_minimo']:
+        ratio = params['ancho_reescalado'] / width
+        gray = cv2.resize(gray, (params['ancho_reescalado'], int(height * ratio)), interpolation=cv2.INTER_CUBIC)
+        steps.append('reescalado')
+
+    if stats['ruido'] > params['ruido_maximo']:
+        cv2.medianBlur(gray, params['mediana'], dst=gray)
+        steps.append('mediana')
+
+    uneven = stats['iluminacion'] > params['iluminacion_maxima']
+    # Con iluminación desigual el umbral adaptativo ya trabaja por zonas
+    if not uneven and 0 < stats['rango'] < params['rango_minimo']:
+        # Tabla de 256 entradas: tinta -> 0, papel -> 255, aplicada en el mismo buffer
+        span = max(1, stats['papel'] - stats['tinta'])
+        lut = np.clip((np.arange(256) - stats['tinta']) * 255.0 / span, 0, 255).astype(np.uint8)
+        cv2.LUT(gray, lut, dst=gray)
+        steps.append('contraste')
+
+    if abs(stats['inclinacion']) >= params['inclinacion_minima']:
+        height, width = gray.shape
+        rotation = cv2.getRotationMatrix2D((width / 2, height / 2), stats['inclinacion'], 1.0)
+        gray = cv2.warpAffine(gray, rotation, (width, height), flags=cv2.INTER_LINEAR,
+                              borderMode=cv2.BORDER_CONSTANT, borderValue=255)
+        steps.append('enderezado')
+
+    if uneven:
+        gray = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY,
+                                     params['bloque_adaptativo'], 15)
+        steps.append('umbral_adaptativo')
+    else:
+        cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU, dst=gray)
+        steps.append('umbral_otsu')
+
+    return Image.fromarray(gray), steps, stats
@@ -0,0 +1,50 @@
+# ingestion.py
+import asyncio
+import os
+from database import db
+from invoice_processor import processor
+
+
+async def ingest_file(file_path, content_hash=None):
+    """Procesa un archivo con OCR y guarda la factura en la base de datos"""
+    invoice_data = await processor.process_invoice(file_path, content_hash)
+
+    print(f"📊 Datos extraídos: {invoice_data}")
+
+    invoice_id = db.save_invoice(invoice_data)
+    if not invoice_id:
+        raise Exception("Error guardando factura en base de datos")
+
+    print(f"💾 Guardado en BD con ID: {invoice_id}")
+    return invoice_id, invoice_data
+
+
+async def ingest_batch(files, concurrency, results):
+    """Procesa un lote de archivos ya guardados con concurrencia acotada.
+
+    files = [{archivo, file_path, content_hash}, ...]. Cada resultado se pone
+    en la cola results en cuanto termina (orden de finalización) y el archivo
+    temporal se elimina. Devuelve todos los resultados.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def ingest_one(item):
+        async with semaphore:
+            try:
+                invoice_id, invoice_data = await ingest_file(item['file_path'], item.get('content_hash'))
+                result = {
+                    "archivo": item['archivo'],
+                    "status": "procesada",
+                    "invoice_id": str(invoice_id),
+                    "invoice_data": invoice_data
+                }
+            except Exception as e:
+                print(f"❌ Error procesando {item['archivo']} del lote: {e}")
+                result = {"archivo": item['archivo'], "status": "error", "error": str(e) or type(e).__name__}
+            finally:
+                if os.path.exists(item['file_path']):
+                    os.remove(item['file_path'])
+        await results.put(result)
+        return result
+
+    return await asyncio.gather(*(ingest_one(item) for item in files))
@@ -1,13 +1,26 @@
-# invoice_processor.py (VERSIÓN QUE GUARDA IMÁGENES)
+# invoice_processor.py
+import asyncio
+import atexit
 import pytesseract
 import fitz  # PyMuPDF - no necesita poppler
 from PIL import Image, ImageEnhance, ImageFilter
-import io
 import re
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import aiofiles
 import os
 from datetime import datetime
 import config
+import copy
+from ocr_executor import OCRExecutor, OCRQueueFullError, OCRTimeoutError
+from psm_stats import PSMStats, order_configs
+from ocr_cache import OCRCache, hash_file
+from field_extraction import extract_fields
+from supplier_templates import SupplierRegistry
+from roi_ocr import roi_ocr
+from artifact_store import create_artifact_store
+from ocr_engine import EnginePool, TESSEROCR_AVAILABLE, parse_psm
+import image_preprocessing
 
 class InvoiceProcessor:
     def __init__(self):
@@ -15,61 +28,299 @@ class InvoiceProcessor:
         pytesseract.pytesseract.tesseract_cmd = config.Config.TESSERACT_PATH
         print(f"✅ Tesseract configurado en: {config.Config.TESSERACT_PATH}")
         print(f"📄 Usando PyMuPDF para conversión PDF → Imagen")
+        
+        # Tiempo máximo de cada llamada a Tesseract (mata el subproceso colgado)
+        self.ocr_timeout = config.Config.OCR_JOB_TIMEOUT
+        
+        # Pool de motores en el propio proceso (tesserocr) reutilizados entre páginas; si no, pytesseract.
+        # Un motor por hilo que hace OCR a la vez: configuraciones PSM en paralelo (x workers si son hilos)
+        self.engines = None
+        engine = config.Config.OCR_ENGINE
+        if engine == 'tesserocr' and not TESSEROCR_AVAILABLE:
+            print("⚠️  tesserocr no instalado, se usa pytesseract")
+        if engine in ('auto', 'tesserocr') and TESSEROCR_AVAILABLE:
+            engines_per_worker = max(1, config.Config.OCR_PSM_PARALLELISM)
+            if config.Config.OCR_EXECUTOR_MODE != 'process':
+                engines_per_worker *= max(1, config.Config.OCR_WORKERS)
+            self.engines = EnginePool(
+                'spa',
+                config.Config.TESSDATA_PREFIX,
+                size=engines_per_worker,
+                max_pages=config.Config.OCR_ENGINE_MAX_PAGES,
+                health_interval=config.Config.OCR_ENGINE_HEALTH_SECONDS
+            )
+            print("✅ OCR con tesserocr (motores precargados por worker)")
+        
+        # Páginas de un mismo PDF en paralelo (para no acaparar el pool)
+        self.pdf_page_concurrency = max(1, config.Config.PDF_PAGE_CONCURRENCY)
+        
+        # Resolución de rasterizado (adaptativa entre mínimo y máximo) y parámetros de preprocesamiento
+        self.pdf_dpi = config.Config.PDF_DPI_MAX
+        self.pdf_dpi_min = min(config.Config.PDF_DPI_MIN, self.pdf_dpi)
+        self.pdf_text_height = config.Config.PDF_TEXT_HEIGHT_PX
+        self.preprocess_params = {
+            'contraste': 2.0,
+            'nitidez': 2.0,
+            'ancho_minimo': 800,
+            'ancho_reescalado': 1200,
+            'mediana': 3,
+            'brillo': 1.1
+        }
+        # Sin OpenCV instalado se usa la cadena PIL
+        self.preprocess_engine = config.Config.OCR_PREPROCESS_ENGINE
+        if self.preprocess_engine == 'opencv' and not image_preprocessing.OPENCV_AVAILABLE:
+            print("⚠️  OpenCV no disponible, preprocesamiento con PIL")
+            self.preprocess_engine = 'pil'
+        
+        # Usar la capa de texto embebida del PDF antes de rasterizar
+        self.pdf_text_layer = config.Config.PDF_TEXT_LAYER_ENABLED
+        self.pdf_text_layer_min_chars = config.Config.PDF_TEXT_LAYER_MIN_CHARS
+        
+        # Configuraciones de Tesseract que compiten en imágenes
+        self.psm_configs = [
+            '',  # Configuración por defecto
+            '--psm 6',  # Bloque uniforme de texto
+            '--psm 4',  # Columna única de texto
+            '--psm 3',  # Página completamente automática
+        ]
+        self.psm_parallelism = max(1, config.Config.OCR_PSM_PARALLELISM)
+        self.quality_threshold = config.Config.OCR_QUALITY_THRESHOLD
+        self.psm_stats = PSMStats(config.Config.PSM_STATS_FILE)
+        
+        # OCR por regiones de interés (cabecera, totales, impuestos)
+        self.roi_enabled = config.Config.OCR_ROI_ENABLED
+        self.roi_params = {
+            'escala': config.Config.OCR_ROI_SCALE,
+            'margen': config.Config.OCR_ROI_PADDING,
+            'min_palabras_clave': config.Config.OCR_ROI_MIN_KEYWORDS
+        }
+        
+        # Plantillas por proveedor (recargadas en caliente cuando cambia el archivo)
+        self.supplier_templates = SupplierRegistry(
+            config.Config.SUPPLIER_TEMPLATES_FILE,
+            detect_lines=config.Config.SUPPLIER_DETECT_LINES
+        )
+        
+        # Imágenes de página sólo en modo depuración, guardadas por un hilo de fondo
+        self.artifacts = create_artifact_store()
+        atexit.register(self.artifacts.close)
+        
+        # Caché de resultados por hash del archivo + configuración
+        self.cache = None
+        if config.Config.OCR_CACHE_ENABLED:
+            self.cache = OCRCache(config.Config.OCR_CACHE_FOLDER, config.Config.OCR_CACHE_MAX_MB * 1024 * 1024)
+        
+        # El pool se crea al primer trabajo, nunca dentro de los procesos hijos
+        self.executor = OCRExecutor(
+            mode=config.Config.OCR_EXECUTOR_MODE,
+            max_workers=config.Config.OCR_WORKERS,
+            max_queue=config.Config.OCR_MAX_QUEUE,
+            job_timeout=config.Config.OCR_JOB_TIMEOUT,
+            initializer=_warm_ocr_worker,
+            finalizer=_finish_ocr_job
+        )
+    
+    def warm_engines(self):
+        """Cargar un motor OCR más antes del primer trabajo (inicializador de cada worker)"""
+        if self.engines is None:
+            return
+        try:
+            self.engines.warm()
+        except Exception as e:
+            # Sin motor precargado se creará (o fallará con su error) en la primera página
+            print(f"⚠️  No se pudo precargar el motor OCR: {e}")
+    
+    def worker_report(self):
+        """Motores OCR y artefactos de este proceso"""
+        return {
+            "motores": self.engines.stats() if self.engines is not None else None,
+            "artefactos": self.artifacts.stats()
+        }
+    
+    def ocr_worker_stats(self):
+        """Estadísticas de motores y artefactos: por proceso de trabajo o del propio servidor"""
+        if self.executor.mode == "process":
+            return {"por_worker": self.executor.worker_reports()}
+        return self.worker_report()
     
     async def extract_text_from_file(self, file_path):
-        """Extrae texto de PDF o imágenes con preprocesamiento mejorado"""
+        """Extrae texto de PDF o imágenes en el ejecutor OCR (no bloquea el event loop)"""
+        text, _ = await self.extract_document(file_path)
+        return text
+    
+    async def extract_document(self, file_path):
+        """Extrae texto y el método usado en cada página ('texto', 'ocr' o 'roi')"""
         file_extension = file_path.split('.')[-1].lower()
         
         if file_extension == 'pdf':
             return await self._extract_from_pdf(file_path)
         else:
-            return await self._extract_from_image(file_path)
+            result = await self.executor.run(_extract_image_job, file_path, self.psm_stats.snapshot())
+            if result['config'] is not None:
+                self.psm_stats.record(result['layout'], result['config'])
+            return result['texto'], [{"pagina": 1, "metodo": result.get('metodo', 'ocr'), "config": result['config']}]
+    
+    def _ocr(self, image, config_str=''):
+        """Ejecuta Tesseract con el límite de tiempo por trabajo"""
+        psm = parse_psm(config_str) if self.engines is not None else None
+        if psm is not None:
+            with self.engines.acquire() as engine:
+                return engine.recognize(image, psm, self.ocr_timeout)
+        return pytesseract.image_to_string(image, lang='spa', config=config_str, timeout=self.ocr_timeout)
+    
+    def _ocr_data(self, image, config_str=''):
+        """Palabras con su caja (image_to_data) para la pasada de diseño"""
+        return pytesseract.image_to_data(image, lang='spa', config=config_str, timeout=self.ocr_timeout,
+                                         output_type=pytesseract.Output.DICT)
+    
+    def _roi_ocr(self, image):
+        """Texto de las regiones con campos o None si hay que leer la página completa"""
+        if not self.roi_enabled:
+            return None
+        try:
+            text = roi_ocr(
+                image,
+                self._ocr_data,
+                lambda crop: self._ocr(crop, '--psm 6'),
+                scale=self.roi_params['escala'],
+                padding=self.roi_params['margen'],
+                min_keywords=self.roi_params['min_palabras_clave']
+            )
+        except Exception as e:
+            print(f"  ⚠️  OCR por regiones falló, se lee la página completa: {e}")
+            return None
+        if text is not None:
+            print(f"  🔍 OCR por regiones: {len(text)} caracteres")
+        return text
     
     async def _extract_from_pdf(self, file_path):
-        """Extrae texto de PDF usando PyMuPDF para convertir a imagen Y GUARDA LAS IMÁGENES"""
+        """Extrae texto de PDF repartiendo las páginas entre los workers OCR"""
         try:
             print(f"📄 Convirtiendo PDF a imágenes con PyMuPDF: {file_path}")
             
-            # Crear carpeta para imágenes si no existe
-            images_folder = "pdf_images"
-            if not os.path.exists(images_folder):
-                os.makedirs(images_folder)
-                print(f"📁 Carpeta creada: {images_folder}")
+            with fitz.open(file_path) as doc:
+                page_count = len(doc)
             
-            # Abrir el PDF
-            doc = fitz.open(file_path)
-            text = ""
+            # Límite por documento: un PDF grande no acapara todo el pool
+            semaphore = asyncio.Semaphore(self.pdf_page_concurrency)
             
-            for page_num in range(len(doc)):
-                print(f"📄 Procesando página {page_num + 1}...")
-                page = doc.load_page(page_num)
-                
-                # Convertir página a imagen (300 DPI para buena calidad)
-                pix = page.get_pixmap(matrix=fitz.Matrix(300/72, 300/72))
-                
-                # Convertir a formato PIL Image
-                img_data = pix.tobytes("ppm")
-                image = Image.open(io.BytesIO(img_data))
-                
-                # GUARDAR IMAGEN
-                pdf_name = os.path.splitext(os.path.basename(file_path))[0]
-                image_path = os.path.join(images_folder, f"{pdf_name}_page_{page_num + 1}.png")
-                image.save(image_path, "PNG")
-                print(f"💾 Imagen guardada: {image_path}")
-                
-                # Preprocesar imagen para mejor OCR
-                processed_image = self._preprocess_image(image)
-                page_text = pytesseract.image_to_string(processed_image, lang='spa')
-                text += f"\n--- Página {page_num + 1} ---\n{page_text}"
+            async def run_page(page_num):
+                async with semaphore:
+                    return await self.executor.run(_ocr_pdf_page_job, file_path, page_num)
+            
+            # gather conserva el orden de las páginas; si una falla se cancelan las demás
+            # para que no sigan ocupando huecos del ejecutor
+            tasks = [asyncio.create_task(run_page(page_num)) for page_num in range(page_count)]
+            try:
+                pages = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+            
+            text = "".join(f"\n--- Página {page_num + 1} ---\n{page['texto']}"
+                           for page_num, page in enumerate(pages))
+            paginas = [{"pagina": page_num + 1, "metodo": page['metodo'], "dpi": page.get('dpi')}
+                       for page_num, page in enumerate(pages)]
             
-            doc.close()
-            return text
+            text_pages = sum(1 for page in paginas if page['metodo'] == 'texto')
+            print(f"📑 {text_pages}/{page_count} páginas desde capa de texto, {page_count - text_pages} con OCR")
+            return text, paginas
             
+        except (OCRQueueFullError, OCRTimeoutError):
+            # La API los traduce a 503/504
+            raise
         except Exception as e:
             raise Exception(f"Error procesando PDF: {str(e)}")
+    
+    def _ocr_pdf_page(self, file_path, page_num):
+        """Extrae una página del PDF: capa de texto si es útil, si no rasteriza y aplica OCR"""
+        print(f"📄 Procesando página {page_num + 1}...")
+        
+        with fitz.open(file_path) as doc:
+            page = doc.load_page(page_num)
+            
+            # PDF nativo: el texto embebido cuesta milisegundos frente a segundos de OCR
+            if self.pdf_text_layer:
+                embedded_text = page.get_text()
+                if self._is_usable_text_layer(embedded_text):
+                    print(f"  📝 Página {page_num + 1}: capa de texto embebida")
+                    return {"texto": embedded_text, "metodo": "texto"}
+            
+            # Convertir página a imagen en grises, a la resolución que pide su texto
+            pix, dpi = self._render_page(page)
+            print(f"  🖨️  Página {page_num + 1}: {dpi} DPI ({pix.width}x{pix.height})")
+        
+        # La imagen es una vista sobre las muestras del pixmap: se evita la copia
+        # de pix.samples y la decodificación PPM. El preprocesamiento hace la
+        # copia de trabajo y la vista se suelta antes que el pixmap
+        image = Image.frombuffer("L", (pix.width, pix.height), pix.samples_mv, "raw", "L", pix.stride, 1)
+        try:
+            # Imagen de la página para depuración (no bloquea: la codifica el hilo de fondo)
+            if self.artifacts.enabled:
+                pdf_name = os.path.splitext(os.path.basename(file_path))[0]
+                self.artifacts.save_image(f"{pdf_name}_page_{page_num + 1}", image.copy())
+            
+            # Preprocesar imagen para mejor OCR
+            processed_image = self._preprocess_image(image)
+            if processed_image is image:
+                processed_image = image.copy()
+        finally:
+            del image
+            del pix
+        
+        roi_text = self._roi_ocr(processed_image)
+        if roi_text is not None:
+            return {"texto": roi_text, "metodo": "roi", "dpi": dpi}
+        return {"texto": self._ocr(processed_image), "metodo": "ocr", "dpi": dpi}
+    
+    def _render_page(self, page):
+        """Rasteriza en grises a la menor resolución con la que el texto sigue siendo legible.
+        
+        Primero a pdf_dpi_min; si la altura de línea estimada no alcanza
+        pdf_text_height se vuelve a renderizar al DPI necesario (múltiplo de 25,
+        como mucho pdf_dpi). Devuelve (pixmap en grises, dpi).
+        """
+        # Sin NumPy/OpenCV no se puede medir el texto: directamente a la resolución máxima
+        dpi = self.pdf_dpi
+        if self.pdf_dpi_min < self.pdf_dpi and image_preprocessing.OPENCV_AVAILABLE:
+            dpi = self.pdf_dpi_min
+        pix = self._pixmap(page, dpi)
+        if dpi < self.pdf_dpi:
+            text_height = self._estimate_text_height(pix)
+            # Sin texto visible no hay nada que agrandar
+            if text_height is not None:
+                needed = min(self.pdf_dpi, math.ceil(dpi * self.pdf_text_height / text_height / 25) * 25)
+                if needed > dpi:
+                    dpi = needed
+                    pix = self._pixmap(page, dpi)
+        return pix, dpi
+    
+    def _pixmap(self, page, dpi):
+        return page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), colorspace=fitz.csGRAY, alpha=False)
+    
+    def _estimate_text_height(self, pix):
+        """Altura de línea en píxeles del pixmap en grises (None si no hay texto)"""
+        np = image_preprocessing.np
+        gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+        return image_preprocessing.estimate_text_height(gray)
+    
+    def _is_usable_text_layer(self, text):
+        """Decide si la capa de texto de una página sirve (no es un escaneo ni texto basura)"""
+        visible = [char for char in text if not char.isspace()]
+        if len(visible) < self.pdf_text_layer_min_chars:
+            return False
+        
+        # Fuentes sin mapa Unicode producen símbolos o U+FFFD en lugar de letras
+        readable = sum(1 for char in visible if char.isalnum() or char in '.,:;/$%-()#')
+        return readable / len(visible) >= 0.8
 
-    async def _extract_from_image(self, file_path):
-        """Extrae texto de imagen con preprocesamiento mejorado"""
+    def _extract_from_image(self, file_path, psm_snapshot=None):
+        """Extrae texto de imagen con preprocesamiento mejorado
+        
+        Devuelve el texto, la configuración ganadora y la huella del diseño.
+        """
         try:
             image = Image.open(file_path)
             print("🔧 Preprocesando imagen para mejor OCR...")
@@ -77,63 +328,123 @@ class InvoiceProcessor:
             # Probar diferentes configuraciones de OCR
             processed_image = self._preprocess_image(image)
             
-            # Intentar con diferentes configuraciones
-            configs = [
-                '',  # Configuración por defecto
-                '--psm 6',  # Bloque uniforme de texto
-                '--psm 4',  # Columna única de texto
-                '--psm 3',  # Página completamente automática
-            ]
+            # Con OCR por regiones no compiten las configuraciones PSM
+            roi_text = self._roi_ocr(processed_image)
+            if roi_text is not None:
+                return {"texto": roi_text, "config": None, "layout": None, "metodo": "roi"}
             
-            best_text = ""
-            best_score = 0
+            # La configuración que más ha ganado en este diseño (o la primera) se prueba sola;
+            # las demás sólo se lanzan si no alcanza el umbral. Una llamada a Tesseract ya
+            # iniciada no se puede cortar, así que lanzarlas todas a la vez no ahorraría CPU
+            layout_key = self._layout_key(processed_image)
+            configs, wins = order_configs(self.psm_configs, psm_snapshot or {}, layout_key)
             
-            for config_str in configs:
-                try:
-                    current_text = pytesseract.image_to_string(processed_image, lang='spa', config=config_str)
-                    score = self._calculate_text_quality(current_text)
-                    
-                    if score > best_score:
-                        best_score = score
-                        best_text = current_text
-                        print(f"  ✅ Config {config_str}: score {score}")
-                except Exception as e:
-                    print(f"  ⚠️  Config {config_str} falló: {e}")
-                    continue
+            best_text, best_score, best_config = self._run_ocr_configs(processed_image, configs[:1])
+            if best_score >= self.quality_threshold:
+                origin = "aprendida" if wins.get(configs[0]) else "inicial"
+                print(f"  🎯 Config {origin} '{configs[0]}' suficiente (score {best_score})")
+                return {"texto": best_text, "config": best_config, "layout": layout_key}
+            configs = configs[1:]
             
-            return best_text if best_text else pytesseract.image_to_string(processed_image, lang='spa')
+            text, score, config_str = self._run_ocr_configs(processed_image, configs)
+            if score > best_score:
+                best_text, best_score, best_config = text, score, config_str
+            
+            if not best_text:
+                return {"texto": self._ocr(processed_image), "config": None, "layout": layout_key}
+            return {"texto": best_text, "config": best_config, "layout": layout_key}
             
         except Exception as e:
             raise Exception(f"Error procesando imagen: {str(e)}")
     
+    def _run_ocr_configs(self, image, configs):
+        """Ejecuta varias configuraciones en paralelo y corta al superar el umbral de calidad
+        
+        El corte sólo evita arrancar las configuraciones que aún esperan hilo
+        (psm_parallelism menor que el número de configuraciones); las que ya
+        corren terminan igualmente y su resultado se descarta.
+        """
+        best_text, best_score, best_config = "", 0, None
+        if not configs:
+            return best_text, best_score, best_config
+        
+        # Tesseract corre en un subproceso, así que los hilos dan paralelismo real
+        pool = ThreadPoolExecutor(max_workers=min(self.psm_parallelism, len(configs)))
+        try:
+            futures = {pool.submit(self._ocr, image, config_str): config_str for config_str in configs}
+            for future in as_completed(futures):
+                config_str = futures[future]
+                try:
+                    current_text = future.result()
+                except Exception as e:
+                    print(f"  ⚠️  Config {config_str} falló: {e}")
+                    continue
+                
+                score = self._calculate_text_quality(current_text)
+                if score > best_score:
+                    best_score = score
+                    best_text = current_text
+                    best_config = config_str
+                    print(f"  ✅ Config {config_str}: score {score}")
+                
+                if best_score >= self.quality_threshold:
+                    print(f"  🎯 Umbral de calidad alcanzado, se descartan las demás configuraciones")
+                    break
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        return best_text, best_score, best_config
+    
+    def _layout_key(self, image):
+        """Huella gruesa del diseño: proporción de la página y reparto de tinta en una rejilla 4x4"""
+        width, height = image.size
+        cells = list(image.convert('L').resize((4, 4), Image.Resampling.BOX).getdata())
+        median = sorted(cells)[len(cells) // 2]
+        ink = "".join('1' if cell < median else '0' for cell in cells)
+        return f"{round(height / width, 1)}:{int(ink, 2):04x}"
+    
     def _preprocess_image(self, image):
         """Mejora la imagen para mejor reconocimiento OCR"""
+        if self.preprocess_engine != 'opencv':
+            return self._preprocess_image_pil(image)
+        try:
+            processed, steps, _ = image_preprocessing.preprocess(image, self.preprocess_params)
+            print(f"  🧪 Preprocesamiento: {', '.join(steps)}")
+            return processed
+        except Exception as e:
+            print(f"⚠️  Error en preprocesamiento OpenCV, se usa PIL: {e}")
+            return self._preprocess_image_pil(image)
+    
+    def _preprocess_image_pil(self, image):
+        """Cadena PIL: grises, contraste, nitidez, reescalado, mediana y brillo"""
         try:
             # Convertir a escala de grises si es color
             if image.mode != 'L':
                 image = image.convert('L')
             
+            params = self.preprocess_params
+            
             # Aumentar contraste
             enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(2.0)
+            image = enhancer.enhance(params['contraste'])
             
             # Aumentar nitidez
             enhancer = ImageEnhance.Sharpness(image)
-            image = enhancer.enhance(2.0)
+            image = enhancer.enhance(params['nitidez'])
             
             # Redimensionar si es muy pequeña
-            if image.size[0] < 800:
-                new_width = 1200
+            if image.size[0] < params['ancho_minimo']:
+                new_width = params['ancho_reescalado']
                 ratio = new_width / image.size[0]
                 new_height = int(image.size[1] * ratio)
                 image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
             
             # Suavizar ruido
-            image = image.filter(ImageFilter.MedianFilter(size=3))
+            image = image.filter(ImageFilter.MedianFilter(size=params['mediana']))
             
             # Aumentar brillo
             enhancer = ImageEnhance.Brightness(image)
-            image = enhancer.enhance(1.1)
+            image = enhancer.enhance(params['brillo'])
             
             return image
             
@@ -164,81 +475,17 @@ class InvoiceProcessor:
     
     def parse_invoice_data(self, text):
         """Analiza el texto extraído con patrones más flexibles"""
-        data = {}
+        print(f"🔍 Analizando texto extraído ({len(text)} caracteres)...")
         
-        print("🔍 Analizando texto extraído...")
-        print(f"📝 Texto completo:\n{text}")
-        print("=" * 50)
+        # Una sola pasada de palabras clave; los patrones sólo se evalúan en las líneas candidatas
+        data = extract_fields(text)
         
-        # Búsqueda por líneas (más efectivo para facturas simples)
-        lines = text.split('\n')
-        print(f"📄 Líneas detectadas: {len(lines)}")
-        
-        for i, line in enumerate(lines):
-            line_clean = line.strip()
-            line_lower = line_clean.lower()
-            
-            if line_clean:
-                print(f"  Línea {i}: '{line_clean}'")
-            
-            # Buscar número de factura
-            if not data.get('numero_factura') or data['numero_factura'] == "No encontrado":
-                if 'factura' in line_lower:
-                    # Extraer cualquier combinación de letras y números después de "factura"
-                    match = re.search(r'(?:factura|invoice)[\s:]*([^\n\r]+)', line, re.IGNORECASE)
-                    if match:
-                        data['numero_factura'] = match.group(1).strip()
-                        print(f"  ✅ Número factura encontrado: {data['numero_factura']}")
-            
-            # Buscar proveedor
-            if not data.get('proveedor') or data['proveedor'] == "No encontrado":
-                if 'proveedor' in line_lower:
-                    match = re.search(r'(?:proveedor|vendor)[\s:]*([^\n\r]+)', line, re.IGNORECASE)
-                    if match:
-                        data['proveedor'] = match.group(1).strip()
-                        print(f"  ✅ Proveedor encontrado: {data['proveedor']}")
-            
-            # Buscar montos - CORRECCIÓN ESPECÍFICA
-            if not data.get('monto_total') or data['monto_total'] == "No encontrado":
-                if 'total' in line_lower:
-                    print(f"  🔍 Buscando monto en línea: '{line_clean}'")
-                    # Buscar patrones de monto en esta línea
-                    amount_patterns = [
-                        r'[\$]?\s*(\d{1,3}(?:,\d{3})*\.\d{2})',  # $1,250.00
-                        r'[\$]?\s*(\d{1,3}(?:\.\d{3})*,\d{2})',  # $1.250,00
-                        r'[\$]?\s*(\d+\.\d{2})',                 # $1250.00
-                        r'[\$]?\s*(\d+,\d{2})',                  # $1250,00
-                        r'total[\s:]*[\$]?\s*([0-9,\.]+)'        # total: $1,250.00
-                    ]
-                    
-                    for pattern in amount_patterns:
-                        match = re.search(pattern, line_clean, re.IGNORECASE)
-                        if match:
-                            raw_amount = match.group(1)
-                            print(f"  💰 Monto crudo encontrado: '{raw_amount}'")
-                            data['monto_total'] = raw_amount
-                            break
-            
-            # Buscar IVA/impuestos
-            if not data.get('impuestos') or data['impuestos'] == "No encontrado":
-                if 'iva' in line_lower:
-                    match = re.search(r'[\$]?\s*(\d+[.,]\d{2})', line_clean)
-                    if match:
-                        data['impuestos'] = match.group(1)
-                        print(f"  ✅ Impuestos encontrados: {data['impuestos']}")
-            
-            # Buscar fechas
-            date_match = re.search(r'(\d{1,2}[/\-]\d{1,2}[/\-]\d{2,4})', line_clean)
-            if date_match:
-                date_str = date_match.group(1)
-                if not data.get('fecha_emision') or data['fecha_emision'] == "No encontrado":
-                    if 'fecha' in line_lower:
-                        data['fecha_emision'] = date_str
-                        print(f"  ✅ Fecha emisión encontrada: {data['fecha_emision']}")
-                if not data.get('fecha_vencimiento') or data['fecha_vencimiento'] == "No encontrado":
-                    if 'vencimiento' in line_lower:
-                        data['fecha_vencimiento'] = date_str
-                        print(f"  ✅ Fecha vencimiento encontrada: {data['fecha_vencimiento']}")
+        # Proveedor conocido: sus reglas tienen prioridad sobre las heurísticas genéricas
+        template = self.supplier_templates.match(text)
+        if template:
+            data.update(template.extract(text))
+            data['plantilla_proveedor'] = template.id
+            print(f"🏷️  Plantilla de proveedor aplicada: {template.id}")
         
         # Si no encontramos algún campo, establecer "No encontrado"
         required_fields = ['numero_factura', 'monto_total', 'impuestos', 'fecha_emision', 'proveedor', 'fecha_vencimiento']
@@ -312,12 +559,38 @@ class InvoiceProcessor:
                 date_str = date_str.replace('-', '/')
                 data[field] = date_str
     
-    async def process_invoice(self, file_path):
+    def settings_fingerprint(self):
+        """Parámetros que afectan al resultado; forman parte de la clave de caché"""
+        return {
+            'version_parser': 1,
+            'plantillas_proveedor': self.supplier_templates.fingerprint(),
+            'dpi': [self.pdf_dpi_min, self.pdf_dpi, self.pdf_text_height],
+            'psm': self.psm_configs,
+            'umbral_calidad': self.quality_threshold,
+            'roi': self.roi_params if self.roi_enabled else None,
+            'capa_texto': [self.pdf_text_layer, self.pdf_text_layer_min_chars],
+            'preprocesamiento': [self.preprocess_engine, self.preprocess_params]
+        }
+    
+    async def process_invoice(self, file_path, content_hash=None):
         """Procesa completo de una factura"""
         print("🔄 Iniciando procesamiento de factura...")
         
+        # Reenvíos del mismo archivo salen de la caché sin repetir el OCR
+        cache_key = None
+        if self.cache:
+            if content_hash is None:
+                content_hash = await asyncio.to_thread(hash_file, file_path)
+            cache_key = self.cache.make_key(content_hash, self.settings_fingerprint())
+            cached = self.cache.get(cache_key)
+            if cached:
+                print(f"⚡ Resultado OCR desde caché: {cache_key}")
+                cached['procesado_en'] = datetime.utcnow().isoformat()
+                cached['desde_cache'] = True
+                return cached
+        
         # Extraer texto
-        text = await self.extract_text_from_file(file_path)
+        text, paginas = await self.extract_document(file_path)
         
         print(f"📝 Texto extraído ({len(text)} caracteres)")
         
@@ -328,6 +601,12 @@ class InvoiceProcessor:
         invoice_data['texto_extraido'] = text[:1000] + "..." if len(text) > 1000 else text
         invoice_data['procesado_en'] = datetime.utcnow().isoformat()
         invoice_data['confianza_ocr'] = self._calculate_confidence(text)
+        invoice_data['paginas'] = paginas
+        if content_hash:
+            invoice_data['hash_contenido'] = content_hash
+        
+        if cache_key:
+            self.cache.put(cache_key, copy.deepcopy(invoice_data))
         
         print("🎉 Procesamiento completado!")
         return invoice_data
@@ -355,5 +634,24 @@ class InvoiceProcessor:
         
         return round(confidence, 2)
 
+# Puntos de entrada de los procesos de trabajo del ejecutor OCR
+def _warm_ocr_worker():
+    processor.warm_engines()
+
+def _finish_ocr_job():
+    # Sin atexit en los procesos hijos: las imágenes encoladas se escriben antes de devolver
+    try:
+        processor.artifacts.flush()
+        return processor.worker_report()
+    except Exception as e:
+        print(f"⚠️  Error cerrando trabajo OCR: {e}")
+        return {}
+
+def _extract_image_job(file_path, psm_snapshot):
+    return processor._extract_from_image(file_path, psm_snapshot)
+
+def _ocr_pdf_page_job(file_path, page_num):
+    return processor._ocr_pdf_page(file_path, page_num)
+
 # Instancia global
 processor = InvoiceProcessor()
\ No newline at end of file
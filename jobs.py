@@ -0,0 +1,183 @@
+# jobs.py
+import asyncio
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+import config
+from json_store import JsonLogStore
+
+# Estados de un trabajo
+JOB_QUEUED = "en_cola"
+JOB_RUNNING = "procesando"
+JOB_DONE = "completado"
+JOB_FAILED = "fallido"
+
+
+class JobQueueFullError(Exception):
+    """Se alcanzó el máximo de trabajos pendientes"""
+
+
+class JobQueue:
+    """Cola persistente de trabajos de ingesta con concurrencia acotada.
+
+    Cada cambio de estado se añade al log de trabajos (JsonLogStore), de modo
+    que al reiniciar los trabajos en cola o a medio procesar vuelven a
+    encolarse. El progreso (etapa) se guarda como mucho cada
+    progress_interval segundos por trabajo: sólo es informativo.
+    """
+
+    def __init__(self, data_file, log_file, max_workers=2, max_pending=100, retention_hours=72,
+                 progress_interval=5):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self.retention = timedelta(hours=retention_hours)
+        self.progress_interval = progress_interval
+        self._store = JsonLogStore(data_file, log_file)
+        self.jobs = self._store.data
+        self._last_saved = {}  # job_id -> momento del último guardado
+        self._queue = None
+        self._workers = []
+        self._handler = None
+        print(f"✅ Cola de trabajos inicializada ({len(self.jobs)} trabajos)")
+
+    def _save(self, job_id):
+        try:
+            self._store.put(job_id)
+            self._last_saved[job_id] = time.monotonic()
+        except Exception as e:
+            print(f"❌ Error guardando trabajo {job_id}: {e}")
+
+    def _prune(self):
+        """Descartar los trabajos terminados más antiguos que la retención"""
+        limit = (datetime.utcnow() - self.retention).isoformat()
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job['status'] not in (JOB_QUEUED, JOB_RUNNING) and job['updated_at'] < limit]
+        for job_id in expired:
+            try:
+                self._store.delete(job_id)
+            except Exception as e:
+                print(f"❌ Error descartando trabajo {job_id}: {e}")
+            self._last_saved.pop(job_id, None)
+
+    def _update(self, job_id, **fields):
+        job = self.jobs[job_id]
+        job.update(fields)
+        job['updated_at'] = datetime.utcnow().isoformat()
+        self._save(job_id)
+        return job
+
+    def _report(self, job_id, etapa):
+        """Actualizar la etapa; a disco sólo si pasó progress_interval desde el último guardado"""
+        job = self.jobs[job_id]
+        job['etapa'] = etapa
+        job['updated_at'] = datetime.utcnow().isoformat()
+        if time.monotonic() - self._last_saved.get(job_id, 0) >= self.progress_interval:
+            self._save(job_id)
+
+    def pending_count(self):
+        """Trabajos en cola o en procesamiento"""
+        return sum(1 for job in self.jobs.values() if job['status'] in (JOB_QUEUED, JOB_RUNNING))
+
+    def submit(self, payload):
+        """Encolar un trabajo nuevo; lanza JobQueueFullError si no hay capacidad"""
+        if self._queue is None:
+            raise Exception("La cola de trabajos no está iniciada")
+        pending = self.pending_count()
+        if pending >= self.max_pending:
+            raise JobQueueFullError(f"Cola de trabajos llena ({pending}/{self.max_pending})")
+
+        self._prune()
+        now = datetime.utcnow().isoformat()
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {
+            'job_id': job_id,
+            'status': JOB_QUEUED,
+            'etapa': "En cola",
+            'payload': payload,
+            'created_at': now,
+            'updated_at': now
+        }
+        self._save(job_id)
+        self._queue.put_nowait(job_id)
+        print(f"📬 Trabajo encolado: {job_id} ({self.pending_count()} pendientes)")
+        return self.jobs[job_id]
+
+    def get(self, job_id):
+        """Obtener trabajo por ID"""
+        return self.jobs.get(job_id)
+
+    async def start(self, handler):
+        """Arrancar los workers y reencolar los trabajos que quedaron pendientes"""
+        self._handler = handler
+        self._queue = asyncio.Queue()
+        self._prune()
+
+        recovered = sorted(
+            (job for job in self.jobs.values() if job['status'] in (JOB_QUEUED, JOB_RUNNING)),
+            key=lambda job: job['created_at']
+        )
+        for job in recovered:
+            if job['status'] == JOB_RUNNING:
+                self._update(job['job_id'], status=JOB_QUEUED, etapa="Reencolado tras reinicio")
+            self._queue.put_nowait(job['job_id'])
+        if recovered:
+            print(f"♻️  {len(recovered)} trabajos recuperados tras reinicio")
+
+        self._workers = [asyncio.create_task(self._worker(n)) for n in range(self.max_workers)]
+        print(f"⚙️  {self.max_workers} workers de ingesta iniciados")
+
+    async def stop(self):
+        """Detener los workers (los trabajos en curso se reanudan al reiniciar)"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self, n):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self.jobs.get(job_id)
+                if not job or job['status'] != JOB_QUEUED:
+                    continue
+
+                self._update(job_id, status=JOB_RUNNING, etapa="Iniciando",
+                             started_at=datetime.utcnow().isoformat())
+                print(f"🔄 Worker {n} procesando trabajo {job_id}")
+
+                def report(etapa):
+                    self._report(job_id, etapa)
+
+                try:
+                    result = await self._handler(job, report)
+                    self._update(job_id, status=JOB_DONE, etapa="Completado", resultado=result,
+                                 finished_at=datetime.utcnow().isoformat())
+                    print(f"✅ Trabajo completado: {job_id}")
+                except Exception as e:
+                    print(f"❌ Trabajo fallido {job_id}: {e}")
+                    print(traceback.format_exc())
+                    self._update(job_id, status=JOB_FAILED, etapa="Fallido", error=str(e),
+                                 finished_at=datetime.utcnow().isoformat())
+            finally:
+                self._last_saved.pop(job_id, None)
+                self._queue.task_done()
+
+    def stats(self):
+        """Resumen de la cola"""
+        return {
+            "workers": self.max_workers,
+            "pendientes": self.pending_count(),
+            "capacidad": self.max_pending
+        }
+
+
+# Instancia global
+job_queue = JobQueue(
+    config.Config.JOBS_DATA_FILE,
+    config.Config.JOBS_LOG_FILE,
+    max_workers=config.Config.JOB_WORKERS,
+    max_pending=config.Config.JOB_MAX_PENDING,
+    retention_hours=config.Config.JOB_RETENTION_HOURS,
+    progress_interval=config.Config.JOB_PROGRESS_SAVE_SECONDS
+)
@@ -0,0 +1,97 @@
+# json_store.py
+import json
+import os
+
+
+def load_json(path, default):
+    """Cargar un archivo JSON, devolviendo default si no existe o está corrupto"""
+    try:
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"❌ Error cargando {path}: {e}")
+    return default
+
+
+def save_json_atomic(path, data):
+    """Guardar JSON de forma atómica (archivo temporal + fsync + rename)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class JsonLogStore:
+    """Diccionario persistido como snapshot JSON + log append-only.
+
+    Mismo esquema que DatabaseLog: cada put/delete es una línea JSON con
+    fsync, cuyo coste depende del registro y no del tamaño del archivo. Al
+    arrancar se carga el snapshot y se reproduce el log encima; tras
+    compact_after registros el snapshot se reescribe con los datos vivos y
+    el log se vacía. Un snapshot JSON anterior sin log se carga tal cual.
+    """
+
+    def __init__(self, snapshot_file, log_file, compact_after=500):
+        self.snapshot_file = snapshot_file
+        self.log_file = log_file
+        self.compact_after = max(1, compact_after)
+        self.data = load_json(snapshot_file, {})
+        self._records = self._replay()
+        self._log = open(log_file, 'a', encoding='utf-8')
+
+    def _replay(self):
+        if not os.path.exists(self.log_file):
+            return 0
+        with open(self.log_file, 'rb+') as f:
+            content = f.read()
+            if content and not content.endswith(b'\n'):
+                # Caída a mitad de escritura: se descarta la última línea incompleta
+                f.truncate(content.rfind(b'\n') + 1)
+        count = 0
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"⚠️  Registro ilegible en {self.log_file}, se omite")
+                    continue
+                if record['op'] == 'put':
+                    self.data[record['id']] = record['data']
+                else:
+                    self.data.pop(record['id'], None)
+                count += 1
+        return count
+
+    def put(self, key, value=None):
+        """Guardar (o volver a guardar tras modificarlo) el registro key"""
+        if value is None:
+            value = self.data[key]
+        self.data[key] = value
+        self._append({'op': 'put', 'id': key, 'data': value})
+
+    def delete(self, key):
+        if self.data.pop(key, None) is not None:
+            self._append({'op': 'del', 'id': key})
+
+    def _append(self, record):
+        self._log.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self._log.flush()
+        os.fsync(self._log.fileno())
+        self._records += 1
+        if self._records >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """Escribir el snapshot con los datos vivos y vaciar el log"""
+        save_json_atomic(self.snapshot_file, self.data)
+        self._log.close()
+        self._log = open(self.log_file, 'w', encoding='utf-8')
+        self._records = 0
+
+    def close(self):
+        self._log.close()
@@ -0,0 +1,32 @@
+# migrate_to_sqlite.py
+import argparse
+import os
+import time
+import config
+from database import DatabaseSimple, DatabaseLog, DatabaseSQLite
+
+def migrate_to_sqlite(data_file, log_file, db_path):
+    """Importa invoices_data.json (y el log append-only si existe) a SQLite"""
+    if os.path.exists(log_file) or os.path.exists(f"{log_file}.old"):
+        source = DatabaseLog(data_file=data_file, log_file=log_file)
+    else:
+        source = DatabaseSimple(data_file=data_file)
+
+    invoices = source.get_all_invoices()
+    print(f"📦 Facturas a migrar: {len(invoices)}")
+
+    start = time.time()
+    target = DatabaseSQLite(db_path)
+    imported = target.import_invoices(invoices)
+
+    print(f"✅ {imported} facturas importadas en {db_path} ({time.time() - start:.2f}s)")
+    print("ℹ️  Use DB_BACKEND=sqlite para que la aplicación use la nueva base de datos")
+    return imported
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrar la base de datos JSON a SQLite")
+    parser.add_argument("--data-file", default="invoices_data.json")
+    parser.add_argument("--log-file", default=config.Config.DB_LOG_FILE)
+    parser.add_argument("--db-path", default=config.Config.DB_SQLITE_PATH)
+    args = parser.parse_args()
+    migrate_to_sqlite(args.data_file, args.log_file, args.db_path)
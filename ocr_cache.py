@@ -0,0 +1,122 @@
+# ocr_cache.py
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from json_store import save_json_atomic
+
+
+def hash_file(file_path, chunk_size=1024 * 1024):
+    """SHA-256 del contenido de un archivo"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_settings(settings):
+    """Huella corta de la configuración del procesador"""
+    encoded = json.dumps(settings, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class OCRCache:
+    """Caché en disco de resultados OCR direccionada por contenido.
+
+    Cada entrada es un JSON "<hash_contenido>_<hash_config>.json"; el orden
+    LRU se reconstruye al arrancar a partir del mtime de los archivos.
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # clave -> tamaño en bytes, de menos a más reciente
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(self.folder, exist_ok=True)
+        self._load_index()
+        print(f"✅ Caché OCR inicializada ({len(self.entries)} entradas, {self.total_bytes} bytes)")
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+
+    def _load_index(self):
+        files = []
+        for name in os.listdir(self.folder):
+            if name.endswith('.json'):
+                stat = os.stat(os.path.join(self.folder, name))
+                files.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(files):
+            self.entries[key] = size
+            self.total_bytes += size
+
+    def make_key(self, content_hash, settings):
+        return f"{content_hash}_{hash_settings(settings)}"
+
+    def get(self, key):
+        """Devuelve el resultado cacheado o None"""
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except Exception as e:
+            print(f"⚠️  Entrada de caché ilegible {key}: {e}")
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        os.utime(self._path(key))  # conservar el orden LRU entre reinicios
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Guardar un resultado y desalojar las entradas menos usadas si se excede el tamaño"""
+        try:
+            save_json_atomic(self._path(key), value)
+        except Exception as e:
+            print(f"❌ Error guardando en caché: {e}")
+            return
+        if key in self.entries:
+            self.total_bytes -= self.entries[key]
+        self.entries[key] = os.path.getsize(self._path(key))
+        self.entries.move_to_end(key)
+        self.total_bytes += self.entries[key]
+
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            oldest = next(iter(self.entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key):
+        size = self.entries.pop(key, 0)
+        self.total_bytes -= size
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def invalidate(self, content_hash=None):
+        """Eliminar las entradas de un contenido (todas sus configuraciones) o toda la caché"""
+        keys = [key for key in self.entries if content_hash is None or key.startswith(f"{content_hash}_")]
+        for key in keys:
+            self._remove(key)
+        print(f"🗑️  Caché OCR: {len(keys)} entradas invalidadas")
+        return len(keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entradas": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "aciertos": self.hits,
+            "fallos": self.misses,
+            "desalojos": self.evictions,
+            "tasa_aciertos": round(self.hits / lookups, 3) if lookups else 0.0
+        }
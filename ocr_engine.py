@@ -0,0 +1,187 @@
+# ocr_engine.py
+import contextlib
+import re
+import threading
+import time
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:  # Sin tesserocr se sigue usando pytesseract (un subproceso por llamada)
+    tesserocr = None
+    TESSEROCR_AVAILABLE = False
+
+# Sólo se traducen las configuraciones "" y "--psm N"; el resto va por pytesseract
+PSM_PATTERN = re.compile(r'^\s*(?:--psm\s+(\d+))?\s*$')
+DEFAULT_PSM = 3  # el mismo que usa la línea de comandos de tesseract
+
+
+def parse_psm(config_str):
+    """Modo de segmentación de una configuración, o None si lleva otras opciones"""
+    match = PSM_PATTERN.match(config_str or '')
+    if not match:
+        return None
+    return int(match.group(1)) if match.group(1) else DEFAULT_PSM
+
+
+class TesseractEngine:
+    """API de Tesseract dentro del proceso, con el idioma ya cargado.
+
+    La imagen se entrega como bytes en crudo (SetImageBytes): sin archivo
+    temporal, sin codificar a PNG y sin lanzar un subproceso por página.
+    SetImageBytes sólo acepta bytes, así que tobytes() hace una copia de la
+    página ya preprocesada (una por reconocimiento).
+    """
+
+    def __init__(self, lang, tessdata=None):
+        kwargs = {'lang': lang}
+        if tessdata:
+            kwargs['path'] = tessdata
+        self.lang = lang
+        self.api = tesserocr.PyTessBaseAPI(**kwargs)
+        self.pages = 0
+        self.last_used = time.monotonic()
+
+    def recognize(self, image, psm, timeout):
+        if image.mode != 'L':
+            image = image.convert('L')
+        width, height = image.size
+        self.api.SetPageSegMode(psm)
+        self.api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        try:
+            if not self.api.Recognize(int(timeout * 1000)):
+                raise RuntimeError("Tesseract no terminó el reconocimiento (tiempo límite o error)")
+            return self.api.GetUTF8Text()
+        finally:
+            self.api.Clear()
+            self.pages += 1
+
+    def healthy(self):
+        """Comprobación barata: idioma cargado y un reconocimiento sobre una imagen en blanco"""
+        try:
+            if self.api.GetInitLanguagesAsString() != self.lang:
+                return False
+            self.api.SetImageBytes(b'\xff' * 64, 8, 8, 1, 8)
+            ok = self.api.Recognize(1000)
+            self.api.Clear()
+            return bool(ok)
+        except Exception:
+            return False
+
+    def close(self):
+        try:
+            self.api.End()
+        except Exception:
+            pass
+
+
+class EnginePool:
+    """Motores Tesseract precargados y reutilizados dentro de un proceso.
+
+    Hay como mucho size motores vivos (uno por hilo que hace OCR a la vez);
+    si todos están ocupados la llamada espera a que se libere uno. warm()
+    los crea por adelantado desde el inicializador de cada worker del
+    ejecutor (uno por worker: con hilos todos comparten este pool), así la
+    primera página no paga la carga del idioma. Un motor se recicla tras
+    max_pages páginas (contiene las fugas de memoria de Tesseract), se
+    descarta si falla y se comprueba con healthy() antes de reutilizarlo si
+    lleva más de health_interval segundos sin uso.
+    """
+
+    def __init__(self, lang, tessdata=None, size=1, max_pages=500, health_interval=300):
+        self.lang = lang
+        self.tessdata = tessdata
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.health_interval = health_interval
+        self.created = 0
+        self.recycled = 0
+        self.failed = 0
+        self._idle = []
+        self._live = 0
+        self._cond = threading.Condition()
+
+    def warm(self, count=1):
+        """Crear count motores nuevos y dejarlos libres (sin pasar de size)"""
+        for _ in range(count):
+            with self._cond:
+                if self._live >= self.size:
+                    return
+                self._live += 1
+            engine = self._create()
+            with self._cond:
+                self._idle.append(engine)
+                self._cond.notify()
+
+    def _create(self):
+        # Se llama con un hueco ya reservado en _live; si falla se libera
+        try:
+            engine = TesseractEngine(self.lang, self.tessdata)
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.created += 1
+        return engine
+
+    def _checkout(self):
+        with self._cond:
+            while not self._idle and self._live >= self.size:
+                self._cond.wait()
+            if self._idle:
+                engine = self._idle.pop()
+            else:
+                engine = None
+                self._live += 1
+        if engine is None:
+            return self._create()
+        if time.monotonic() - engine.last_used > self.health_interval and not engine.healthy():
+            print("⚠️  Motor OCR no responde, se reemplaza")
+            engine.close()
+            with self._cond:
+                self.failed += 1
+            return self._create()
+        return engine
+
+    def _checkin(self, engine):
+        engine.last_used = time.monotonic()
+        recycle = self.max_pages and engine.pages >= self.max_pages
+        if recycle:
+            engine.close()
+        with self._cond:
+            if recycle:
+                self.recycled += 1
+                self._live -= 1
+            else:
+                self._idle.append(engine)
+            self._cond.notify()
+
+    def _discard(self, engine):
+        engine.close()
+        with self._cond:
+            self.failed += 1
+            self._live -= 1
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def acquire(self):
+        engine = self._checkout()
+        try:
+            yield engine
+        except Exception:
+            self._discard(engine)
+            raise
+        self._checkin(engine)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "motores": self._live,
+                "libres": len(self._idle),
+                "maximo": self.size,
+                "creados": self.created,
+                "reciclados": self.recycled,
+                "fallidos": self.failed
+            }
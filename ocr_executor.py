@@ -0,0 +1,129 @@
+# ocr_executor.py
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+class OCRQueueFullError(Exception):
+    """La cola del ejecutor OCR está llena"""
+
+
+class OCRTimeoutError(Exception):
+    """Un trabajo OCR superó su tiempo máximo"""
+
+
+def _run_with_finalizer(fn, finalizer, *args):
+    """Punto de entrada en el proceso hijo: el trabajo y después el finalizador"""
+    try:
+        result = fn(*args)
+    finally:
+        # También si el trabajo falla (p. ej. vaciar escrituras pendientes del worker)
+        report = finalizer()
+    return os.getpid(), result, report
+
+
+class OCRExecutor:
+    """Ejecuta el trabajo OCR bloqueante fuera del event loop.
+
+    Modos: "process" (procesos de trabajo, escala por núcleos), "thread"
+    (hilos, útil en desarrollo) e "inline" (comportamiento original,
+    bloquea el event loop).
+
+    En modo "process" el estado de cada worker vive en su proceso, donde
+    atexit no llega a ejecutarse: finalizer() se llama en el worker al
+    terminar cada trabajo y lo que devuelve (sus estadísticas) se guarda por
+    proceso para worker_reports().
+    """
+
+    def __init__(self, mode="process", max_workers=1, max_queue=32, job_timeout=120, initializer=None,
+                 finalizer=None):
+        self.mode = mode
+        self.initializer = initializer  # se ejecuta una vez en cada worker (p. ej. precargar motores)
+        self.finalizer = finalizer
+        self._reports = {}  # pid -> último resultado de finalizer
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self.job_timeout = job_timeout
+        self._pool = None
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        """Crea el pool de forma perezosa (los procesos hijos nunca lo crean)"""
+        if self._pool is None:
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ocr",
+                                                initializer=self.initializer)
+            else:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=self.initializer)
+            print(f"⚙️  Ejecutor OCR iniciado: modo={self.mode}, workers={self.max_workers}, cola={self.max_queue}")
+        return self._pool
+
+    async def run(self, fn, *args):
+        """Ejecuta fn(*args) en el pool respetando la cola acotada y el timeout"""
+        if self.mode == "inline":
+            return fn(*args)
+
+        capacity = self.max_workers + self.max_queue
+        with self._lock:
+            if self._in_flight >= capacity:
+                raise OCRQueueFullError(f"Cola OCR llena ({self._in_flight}/{capacity} trabajos)")
+            self._in_flight += 1
+
+        try:
+            with_report = self.mode == "process" and self.finalizer is not None
+            try:
+                if with_report:
+                    future = self._get_pool().submit(_run_with_finalizer, fn, self.finalizer, *args)
+                else:
+                    future = self._get_pool().submit(fn, *args)
+            except BaseException:
+                self._release()
+                raise
+            # El hueco se libera cuando el trabajo termina de verdad: cancel() no detiene
+            # un trabajo que ya está corriendo y ese worker sigue ocupado tras el timeout
+            future.add_done_callback(self._release)
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.job_timeout)
+            except asyncio.TimeoutError:
+                future.cancel()
+                raise OCRTimeoutError(f"Trabajo OCR excedió {self.job_timeout}s")
+            if with_report:
+                pid, result, report = result
+                self._reports[pid] = report
+            return result
+        except BrokenProcessPool:
+            # Un proceso de trabajo murió: descartar el pool para recrearlo
+            print("⚠️  Pool OCR roto, se recreará en el próximo trabajo")
+            self._pool = None
+            self._reports = {}
+            raise Exception("Proceso de trabajo OCR terminó inesperadamente")
+
+    def _release(self, future=None):
+        # Puede llamarse desde el hilo del pool (callback de concurrent.futures)
+        with self._lock:
+            self._in_flight -= 1
+
+    def stats(self):
+        """Estado actual del ejecutor"""
+        return {
+            "modo": self.mode,
+            "workers": self.max_workers,
+            "trabajos_en_curso": self._in_flight,
+            "capacidad": self.max_workers + self.max_queue,
+            "timeout_segundos": self.job_timeout
+        }
+
+    def worker_reports(self):
+        """Último informe de cada proceso de trabajo (modo process con finalizer)"""
+        return [{"pid": pid, **report} for pid, report in sorted(self._reports.items())]
+
+    def shutdown(self):
+        """Detiene el pool sin esperar trabajos pendientes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            self._reports = {}
+            print("🛑 Ejecutor OCR detenido")
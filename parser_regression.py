@@ -0,0 +1,72 @@
+# parser_regression.py
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+from json_store import load_json, save_json_atomic
+
+CORPUS_FILE = "parser_corpus.json"
+CORPUS_FOLDERS = ["uploads", "pdfs"]
+CORPUS_EXTENSIONS = ('.pdf', '.png', '.jpg', '.jpeg', '.tiff', '.bmp')
+
+
+def _parse(processor, text):
+    """parse_invoice_data sin su salida por consola"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return processor.parse_invoice_data(text)
+
+
+def build_corpus(corpus_file):
+    """Extraer el texto de las facturas de ejemplo y guardar el resultado actual del parser"""
+    from invoice_processor import processor
+
+    corpus = load_json(corpus_file, {})
+    for folder in CORPUS_FOLDERS:
+        for name in sorted(os.listdir(folder)):
+            if not name.lower().endswith(CORPUS_EXTENSIONS):
+                continue
+            path = os.path.join(folder, name)
+            try:
+                text, _ = asyncio.run(processor.extract_document(path))
+            except Exception as e:
+                print(f"⚠️  {path}: sin texto ({e}), se omite")
+                continue
+            corpus[path] = {"texto": text, "esperado": _parse(processor, text)}
+            print(f"✅ {path}: {len(text)} caracteres")
+    processor.executor.shutdown()
+    save_json_atomic(corpus_file, corpus)
+    print(f"💾 Corpus guardado en {corpus_file} ({len(corpus)} documentos)")
+
+
+def check_corpus(corpus_file):
+    """Comparar el parser actual con los resultados guardados; devuelve el número de diferencias"""
+    from invoice_processor import processor
+
+    corpus = load_json(corpus_file, {})
+    if not corpus:
+        print(f"❌ Corpus vacío: ejecute primero python parser_regression.py --build")
+        return 1
+    failures = 0
+    for path, entry in corpus.items():
+        result = _parse(processor, entry['texto'])
+        # Comparar como JSON: el corpus guarda los floats y strings tal cual
+        if json.loads(json.dumps(result, default=str)) != entry['esperado']:
+            failures += 1
+            print(f"❌ {path}")
+            print(f"   esperado: {entry['esperado']}")
+            print(f"   obtenido: {result}")
+    print(f"{'✅' if not failures else '❌'} {len(corpus) - failures}/{len(corpus)} documentos idénticos")
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regresión del parser de facturas sobre los ejemplos")
+    parser.add_argument("--build", action="store_true", help="regenerar el corpus con el parser actual")
+    parser.add_argument("--corpus", default=CORPUS_FILE)
+    args = parser.parse_args()
+    if args.build:
+        build_corpus(args.corpus)
+    else:
+        raise SystemExit(1 if check_corpus(args.corpus) else 0)
@@ -0,0 +1,50 @@
+# psm_stats.py
+from datetime import datetime
+from json_store import load_json, save_json_atomic
+
+GLOBAL_LAYOUT = "*"
+
+
+class PSMStats:
+    """Recuerda qué configuración de Tesseract gana para cada diseño de factura.
+
+    Las victorias se agrupan por una huella del diseño de la imagen y,
+    además, en una entrada global usada cuando el diseño es nuevo.
+    """
+
+    def __init__(self, data_file, max_layouts=500):
+        self.data_file = data_file
+        self.max_layouts = max_layouts
+        self.layouts = load_json(self.data_file, {})
+
+    def snapshot(self):
+        """Copia de las victorias por diseño para enviar a los procesos de trabajo"""
+        return {layout: dict(entry['victorias']) for layout, entry in self.layouts.items()}
+
+    def record(self, layout_key, config_str):
+        """Registrar la configuración ganadora de una imagen"""
+        now = datetime.utcnow().isoformat()
+        for key in (layout_key, GLOBAL_LAYOUT):
+            entry = self.layouts.setdefault(key, {'victorias': {}})
+            entry['victorias'][config_str] = entry['victorias'].get(config_str, 0) + 1
+            entry['actualizado'] = now
+
+        # Acotar el archivo descartando los diseños menos recientes
+        if len(self.layouts) > self.max_layouts:
+            oldest = sorted(
+                (key for key in self.layouts if key != GLOBAL_LAYOUT),
+                key=lambda key: self.layouts[key]['actualizado']
+            )
+            for key in oldest[:len(self.layouts) - self.max_layouts]:
+                del self.layouts[key]
+
+        try:
+            save_json_atomic(self.data_file, self.layouts)
+        except Exception as e:
+            print(f"❌ Error guardando estadísticas PSM: {e}")
+
+
+def order_configs(configs, snapshot, layout_key):
+    """Ordena las configuraciones por victorias (del diseño o globales)"""
+    wins = snapshot.get(layout_key) or snapshot.get(GLOBAL_LAYOUT) or {}
+    return sorted(configs, key=lambda config_str: -wins.get(config_str, 0)), wins
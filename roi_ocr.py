@@ -0,0 +1,74 @@
+# roi_ocr.py
+from PIL import Image
+
+# Palabras que delimitan las zonas con campos (cabecera, totales, impuestos, fechas)
+ROI_KEYWORDS = ('factura', 'invoice', 'proveedor', 'vendor', 'total', 'iva', 'impuesto', 'fecha', 'vencimiento')
+
+
+def layout_lines(data):
+    """Agrupa las palabras de image_to_data por línea: [(texto, left, top, right, bottom), ...]"""
+    lines = {}
+    for n, word in enumerate(data['text']):
+        if not word or not word.strip():
+            continue
+        key = (data['block_num'][n], data['par_num'][n], data['line_num'][n])
+        left, top = data['left'][n], data['top'][n]
+        right, bottom = left + data['width'][n], top + data['height'][n]
+        if key in lines:
+            text, l, t, r, b = lines[key]
+            lines[key] = (f"{text} {word}", min(l, left), min(t, top), max(r, right), max(b, bottom))
+        else:
+            lines[key] = (word, left, top, right, bottom)
+    return sorted(lines.values(), key=lambda line: (line[2], line[1]))
+
+
+def keyword_bands(lines, scale, padding):
+    """Franjas horizontales (a resolución completa) de las líneas con palabras clave.
+
+    Cada franja ocupa todo el ancho (el valor suele estar a la derecha de la
+    etiqueta) y las que se solapan se fusionan. Devuelve (franjas, palabras
+    clave encontradas).
+    """
+    bands = []
+    found = set()
+    for text, _, top, _, bottom in lines:
+        lowered = text.lower()
+        matched = {keyword for keyword in ROI_KEYWORDS if keyword in lowered}
+        if not matched:
+            continue
+        found |= matched
+        pad = padding + (bottom - top) / 2
+        bands.append((max(0, int((top - pad) / scale)), int((bottom + pad) / scale)))
+
+    merged = []
+    for top, bottom in sorted(bands):
+        if merged and top <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], bottom))
+        else:
+            merged.append((top, bottom))
+    return merged, found
+
+
+def roi_ocr(image, ocr_data, ocr_text, scale=0.4, padding=4, min_keywords=2):
+    """OCR por regiones de interés sobre una imagen ya preprocesada.
+
+    ocr_data(imagen) devuelve el dict de image_to_data y ocr_text(imagen) el
+    texto. Primero se localizan las líneas con palabras clave en una copia
+    reducida y después sólo esas franjas se leen a resolución completa.
+    Devuelve el texto (franjas de arriba abajo) o None si el diseño no tiene
+    suficientes zonas reconocibles y hay que leer la página completa.
+    """
+    width, height = image.size
+    small = image.resize((max(1, int(width * scale)), max(1, int(height * scale))), Image.Resampling.BILINEAR)
+    lines = layout_lines(ocr_data(small))
+    bands, found = keyword_bands(lines, scale, padding)
+    if len(found) < min_keywords:
+        return None
+
+    texts = []
+    for top, bottom in bands:
+        crop = image.crop((0, top, width, min(height, bottom)))
+        text = ocr_text(crop).strip()
+        if text:
+            texts.append(text)
+    return "\n".join(texts) if texts else None
@@ -0,0 +1,162 @@
+# smtp_pool.py
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+
+
+class SMTPDispatcher:
+    """Entrega de emails en hilos de fondo con conexiones SMTP reutilizadas.
+
+    Cada hilo mantiene su propia conexión autenticada (el pool) y envía en
+    lotes los mensajes que encuentra en la cola, así el handshake
+    TCP + STARTTLS + login se paga una vez por conexión y no por mensaje.
+    Los reintentos de conexión esperan con backoff exponencial.
+    """
+
+    def __init__(self, host, port, user=None, password=None, use_starttls=True, use_auth=True,
+                 pool_size=2, batch_size=20, idle_timeout=60, max_backoff=60, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_starttls = use_starttls
+        self.use_auth = use_auth
+        self.pool_size = max(1, pool_size)
+        self.batch_size = max(1, batch_size)
+        self.idle_timeout = idle_timeout
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self.sent = 0
+        self.failed = 0
+        self.connections_opened = 0
+
+    def _ensure_started(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for n in range(self.pool_size):
+                thread = threading.Thread(target=self._worker, args=(n,), name=f"smtp-{n}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            print(f"📮 Despachador SMTP iniciado ({self.pool_size} conexiones, lotes de {self.batch_size})")
+
+    def submit(self, message):
+        """Encolar un mensaje; el Future se resuelve con True/False al enviarse"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((message, future))
+        return future
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stop(self, timeout=10):
+        """Detener los hilos tras vaciar los mensajes ya encolados"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_starttls:
+            server.starttls()
+        if self.use_auth:
+            server.login(self.user, self.password)
+        self.connections_opened += 1
+        return server
+
+    def _close(self, server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def _worker(self, n):
+        server = None
+        last_used = 0
+        backoff = 1
+
+        while True:
+            try:
+                item = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                # Conexión ociosa: cerrarla para no depender del timeout del servidor
+                if server is not None:
+                    self._close(server)
+                    server = None
+                continue
+
+            if item is None:
+                break
+
+            # Agrupar lo que ya esté en cola para enviarlo por la misma conexión
+            batch = [item]
+            stop_after_batch = False
+            while len(batch) < self.batch_size:
+                try:
+                    extra = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if extra is None:
+                    stop_after_batch = True
+                    break
+                batch.append(extra)
+
+            for message, future in batch:
+                delivered = False
+                for attempt in range(3):
+                    try:
+                        if server is not None and time.time() - last_used > self.idle_timeout / 2:
+                            server.noop()
+                        if server is None:
+                            print(f"🔄 [smtp-{n}] Conectando a {self.host}:{self.port}...")
+                            server = self._connect()
+                        server.send_message(message)
+                        last_used = time.time()
+                        backoff = 1
+                        delivered = True
+                        break
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                            smtplib.SMTPDataError, smtplib.SMTPAuthenticationError) as e:
+                        # Errores del mensaje o de credenciales: reintentar no ayuda
+                        print(f"❌ [smtp-{n}] Email rechazado: {e}")
+                        break
+                    except OSError as e:
+                        # Desconexiones, timeouts y fallos de conexión (SMTPException hereda de OSError)
+                        print(f"⚠️  [smtp-{n}] Conexión perdida ({e}), reintento en {backoff}s")
+                        if server is not None:
+                            self._close(server)
+                        server = None
+                        time.sleep(backoff)
+                        backoff = min(backoff * 2, self.max_backoff)
+                    except Exception as e:
+                        print(f"❌ [smtp-{n}] Error enviando email: {e}")
+                        break
+
+                if delivered:
+                    self.sent += 1
+                else:
+                    self.failed += 1
+                future.set_result(delivered)
+
+            if stop_after_batch:
+                break
+
+        if server is not None:
+            self._close(server)
+
+    def stats(self):
+        return {
+            "conexiones": self.pool_size,
+            "en_cola": self.pending(),
+            "enviados": self.sent,
+            "fallidos": self.failed,
+            "conexiones_abiertas_total": self.connections_opened
+        }
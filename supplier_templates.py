@@ -0,0 +1,164 @@
+# supplier_templates.py
+import hashlib
+import json
+import os
+import re
+
+# Campos que una plantilla puede definir
+TEMPLATE_FIELDS = ['numero_factura', 'proveedor', 'fecha_emision', 'monto_total', 'impuestos', 'fecha_vencimiento']
+
+
+class SupplierTemplate:
+    """Reglas de extracción compiladas de un proveedor.
+
+    Cada campo admite:
+      - "regex": patrón con un grupo, buscado en todo el texto
+      - "ancla" (+ "desplazamiento" en líneas): la primera línea que contiene
+        el ancla; se aplica "regex" a esa línea o, sin regex, se toma el texto
+        que sigue al ancla
+      - "valor": valor fijo
+      - "decimal": "," si los montos vienen como 1.250,00
+    """
+
+    def __init__(self, spec):
+        self.id = spec['id']
+        self.nombre = spec.get('nombre', self.id)
+        self.identificadores = [identifier.lower() for identifier in spec['identificadores']]
+        self.fields = {}
+        for field, rule in spec.get('campos', {}).items():
+            if field not in TEMPLATE_FIELDS:
+                raise ValueError(f"Campo desconocido '{field}' en la plantilla {self.id}")
+            self.fields[field] = {
+                'regex': re.compile(rule['regex'], re.IGNORECASE | re.MULTILINE) if 'regex' in rule else None,
+                'ancla': re.compile(re.escape(rule['ancla']), re.IGNORECASE) if rule.get('ancla') else None,
+                'desplazamiento': int(rule.get('desplazamiento', 0)),
+                'valor': rule.get('valor'),
+                'decimal': rule.get('decimal', '.')
+            }
+        if 'proveedor' not in self.fields:
+            self.fields['proveedor'] = {'regex': None, 'ancla': None, 'desplazamiento': 0,
+                                        'valor': self.nombre, 'decimal': '.'}
+
+    def _extract_field(self, rule, text, lines):
+        if rule['valor'] is not None:
+            return rule['valor']
+
+        if rule['ancla']:
+            for n, line in enumerate(lines):
+                anchor = rule['ancla'].search(line)
+                if not anchor:
+                    continue
+                target = n + rule['desplazamiento']
+                if not 0 <= target < len(lines):
+                    return None
+                if rule['regex'] is None:
+                    # Sin regex: lo que sigue al ancla (o la línea completa si hay desplazamiento)
+                    value = line[anchor.end():] if rule['desplazamiento'] == 0 else lines[target]
+                    return value.strip(' \t\r:') or None
+                match = rule['regex'].search(lines[target])
+                return match.group(1).strip() if match else None
+            return None
+
+        match = rule['regex'].search(text)
+        return match.group(1).strip() if match else None
+
+    def extract(self, text):
+        """Campos crudos encontrados por la plantilla (sólo los que aparecen)"""
+        lines = text.split('\n')
+        data = {}
+        for field, rule in self.fields.items():
+            value = self._extract_field(rule, text, lines)
+            if not value:
+                continue
+            if rule['decimal'] == ',' and field in ('monto_total', 'impuestos'):
+                value = value.replace('.', '').replace(',', '.')
+            data[field] = value
+        return data
+
+
+class SupplierRegistry:
+    """Plantillas por proveedor cargadas de un JSON y mantenidas compiladas en memoria.
+
+    El proveedor se detecta con una sola búsqueda (alternación de todos los
+    identificadores) sobre las primeras líneas del texto. El archivo se
+    recarga solo cuando cambia su mtime; si la nueva versión es inválida se
+    conservan las plantillas anteriores.
+    """
+
+    def __init__(self, path, detect_lines=15):
+        self.path = path
+        self.detect_lines = detect_lines
+        self.templates = {}
+        self.version = None
+        self.matches = {}
+        self._index = {}
+        self._detector = None
+        self._mtime = None
+        self.reload_if_changed()
+
+    def reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime == self._mtime:
+            return False
+        self._mtime = mtime
+        if mtime is None:
+            self._install({}, None)
+            return True
+        try:
+            with open(self.path, 'rb') as f:
+                raw = f.read()
+            specs = json.loads(raw.decode('utf-8'))['proveedores']
+            templates = {}
+            for spec in specs:
+                template = SupplierTemplate(spec)
+                templates[template.id] = template
+        except Exception as e:
+            print(f"❌ Plantillas de proveedor inválidas en {self.path}, se mantienen las anteriores: {e}")
+            return False
+        self._install(templates, hashlib.sha256(raw).hexdigest()[:16])
+        print(f"✅ Plantillas de proveedor cargadas: {len(templates)}")
+        return True
+
+    def _install(self, templates, version):
+        index = {}
+        for template in templates.values():
+            for identifier in template.identificadores:
+                index.setdefault(identifier, template)
+        # Los identificadores más largos primero para que ganen al más corto que contienen
+        identifiers = sorted(index, key=len, reverse=True)
+        self._detector = re.compile('|'.join(map(re.escape, identifiers))) if identifiers else None
+        self._index = index
+        self.templates = templates
+        self.version = version
+
+    def match(self, text):
+        """Plantilla del proveedor detectado en las primeras líneas, o None"""
+        self.reload_if_changed()
+        if self._detector is None:
+            return None
+        head = '\n'.join(text.split('\n', self.detect_lines)[:self.detect_lines]).lower()
+        found = self._detector.search(head)
+        if not found:
+            return None
+        template = self._index[found.group()]
+        self.matches[template.id] = self.matches.get(template.id, 0) + 1
+        return template
+
+    def fingerprint(self):
+        """Versión de las plantillas (forma parte de la clave de caché OCR)"""
+        self.reload_if_changed()
+        return self.version
+
+    def stats(self):
+        return {
+            "archivo": self.path,
+            "version": self.version,
+            "plantillas": [
+                {"id": template.id, "nombre": template.nombre,
+                 "campos": sorted(template.fields), "coincidencias": self.matches.get(template.id, 0)}
+                for template in self.templates.values()
+            ]
+        }